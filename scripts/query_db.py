@@ -22,8 +22,8 @@ Examples:
     # Search message content
     python query_db.py "SELECT author_name, content FROM cached_messages WHERE content LIKE '%hello%' LIMIT 10"
 
-    # Join with message_history for more details
-    python query_db.py "SELECT h.author_nickname, h.content, h.reactions FROM message_history h WHERE h.content LIKE '%thanks%' LIMIT 10"
+    # Query the underlying table directly (cached_messages is a view over it)
+    python query_db.py "SELECT h.author_nickname, h.content, h.reply_to_id FROM message_history h WHERE h.content LIKE '%thanks%' LIMIT 10"
 """
 import argparse
 import json
@@ -27,6 +27,7 @@ import json
 import logging
 import os
 import sqlite3
+from contextlib import closing
 from pathlib import Path
 
 from fastapi import WebSocket
@@ -90,6 +91,9 @@ _latest_stats: dict = {
 _active_task_ids: set[str] = set()
 """Set of tool_use IDs for currently active Task calls."""
 
+_subagents_dirs: dict[str, Path] = {}
+"""Session ID -> subagents directory, so polls skip re-scanning projects/."""
+
 
 # =============================================================================
 # Event Reading Functions
@@ -214,7 +218,7 @@ async def tail_stream() -> None:
                         if current_size <= pos:
                             continue
 
-                        with open(STREAM_FILE) as f:
+                        with open(STREAM_FILE, encoding="utf-8") as f:
                             f.seek(pos)
                             new_lines = f.readlines()
                             pos = f.tell()
@@ -275,6 +279,25 @@ def client_count() -> int:
     return len(connected_clients)
 
 
+# =============================================================================
+# Database Access
+# =============================================================================
+
+
+def _connect_readonly() -> closing[sqlite3.Connection]:
+    """Open a read-only connection to the wendy database.
+
+    The dashboard only ever reads, so connections are opened with
+    ``mode=ro`` and ``query_only`` -- they never take the write lock the bot
+    needs and can't contend with its writer. Use as a context manager; the
+    connection is closed on exit.
+    """
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, timeout=5.0)
+    conn.execute("PRAGMA query_only=1")
+    conn.row_factory = sqlite3.Row
+    return closing(conn)
+
+
 # =============================================================================
 # Statistics Functions
 # =============================================================================
@@ -302,11 +325,12 @@ def get_stats() -> dict:
         "cached_messages": 0,
     }
 
-    # Get session state from SQLite
+    if not DB_PATH.exists():
+        return stats
     try:
-        if DB_PATH.exists():
-            with sqlite3.connect(DB_PATH) as conn:
-                conn.row_factory = sqlite3.Row
+        with _connect_readonly() as conn:
+            # Get session state from SQLite
+            try:
                 # Get first channel's session stats
                 row = conn.execute(
                     "SELECT * FROM channel_sessions ORDER BY last_used_at DESC LIMIT 1"
@@ -317,17 +341,17 @@ def get_stats() -> dict:
                     stats["total_input"] = row["total_input_tokens"]
                     stats["total_output"] = row["total_output_tokens"]
                     stats["cache_read"] = row["total_cache_read_tokens"]
-    except Exception as e:
-        _LOG.debug("Failed to read session state: %s", e)
+            except Exception as e:
+                _LOG.debug("Failed to read session state: %s", e)
 
-    # Get message history count
-    try:
-        if DB_PATH.exists():
-            with sqlite3.connect(DB_PATH) as conn:
+            # Get message history count
+            try:
                 count = conn.execute("SELECT COUNT(*) FROM message_history").fetchone()[0]
                 stats["cached_messages"] = count  # Keep key for backwards compat
+            except Exception as e:
+                _LOG.debug("Failed to count message history: %s", e)
     except Exception as e:
-        _LOG.debug("Failed to count message history: %s", e)
+        _LOG.debug("Failed to open database: %s", e)
 
     return stats
 
@@ -413,25 +437,31 @@ def get_subagents_dir() -> Path | None:
     try:
         if not DB_PATH.exists():
             return None
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        row = conn.execute(
-            "SELECT session_id FROM channel_sessions ORDER BY last_used_at DESC LIMIT 1"
-        ).fetchone()
-        conn.close()
+        with _connect_readonly() as conn:
+            row = conn.execute(
+                "SELECT session_id FROM channel_sessions ORDER BY last_used_at DESC LIMIT 1"
+            ).fetchone()
 
         if not row or not row["session_id"]:
             return None
 
         session_id = row["session_id"]
+        cached = _subagents_dirs.get(session_id)
+        if cached is not None and cached.exists():
+            return cached
+
         projects_dir = CLAUDE_DIR / "projects"
         if not projects_dir.exists():
             return None
 
-        for project_dir in projects_dir.glob("-data-wendy-channels-*"):
-            subagents_dir = project_dir / session_id / "subagents"
-            if subagents_dir.exists():
-                return subagents_dir
+        with os.scandir(projects_dir) as it:
+            for entry in it:
+                if not entry.name.startswith("-data-wendy-channels-"):
+                    continue
+                subagents_dir = Path(entry.path) / session_id / "subagents"
+                if subagents_dir.exists():
+                    _subagents_dirs[session_id] = subagents_dir
+                    return subagents_dir
 
         return None
     except Exception as e:
@@ -455,8 +485,11 @@ def list_agents() -> list[dict]:
 
     agents = []
     try:
-        for f in subagents_dir.glob("agent-*.jsonl"):
-            stat = f.stat()
+        with os.scandir(subagents_dir) as it:
+            entries = [e for e in it if e.name.startswith("agent-") and e.name.endswith(".jsonl")]
+        for entry in entries:
+            f = Path(entry.path)
+            stat = entry.stat()
             agent_id = f.stem.replace("agent-", "")
 
             # Read first line to get agent metadata and task description
@@ -558,7 +591,7 @@ def get_channels_map() -> dict:
     try:
         if not DB_PATH.exists():
             return {}
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect_readonly() as conn:
             rows = conn.execute(
                 """
                 SELECT cs.channel_id, COALESCE(tr.thread_name, cs.folder) AS display_name
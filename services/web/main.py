@@ -53,6 +53,7 @@ import subprocess
 import tarfile
 import time
 import uuid
+from contextlib import closing
 from pathlib import Path
 
 import auth
@@ -93,6 +94,7 @@ SITES_DIR: Path = Path(os.environ.get("SITES_DIR", "/data/sites"))
 MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024
 BASE_URL: str = os.environ.get("BASE_URL", "https://wendy.monster")
 SITE_NAME_RE: re.Pattern = re.compile(r"^[a-z0-9][a-z0-9-]{0,30}[a-z0-9]$|^[a-z0-9]$")
+TASK_ID_RE: re.Pattern = re.compile(r"[a-zA-Z0-9_-]+")
 RESERVED_NAMES = {"api", "health", "admin", "static", "assets", "ws", "brain", "game", "webhook", "avatar"}
 
 # Games
@@ -635,7 +637,7 @@ async def brain_task_log(
 ) -> dict:
     # Validate task_id before using it in a glob pattern -- glob metacharacters
     # like * or ? would enumerate unintended files; ../ would path-traverse.
-    if not re.fullmatch(r"[a-zA-Z0-9_-]+", task_id):
+    if not TASK_ID_RE.fullmatch(task_id):
         raise HTTPException(status_code=400, detail="Invalid task ID")
     logs_dir = Path("/data/wendy/orchestrator_logs")
     if not logs_dir.exists():
@@ -730,7 +732,11 @@ def _write_notification(channel_id: str, source: str, event_type: str, summary:
     payload_str = json.dumps({"event_type": event_type, "raw": payload})
     try:
         WENDY_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-        with sqlite3.connect(WENDY_DB_PATH, timeout=30.0) as conn:
+        with closing(sqlite3.connect(WENDY_DB_PATH, timeout=30.0)) as conn:
+            # Match the bot's connection settings: WAL with NORMAL sync only
+            # fsyncs at checkpoints instead of on every commit.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS notifications (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
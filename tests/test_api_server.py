@@ -0,0 +1,53 @@
+"""Tests for wendy.api_server send paths."""
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from wendy import api_server
+
+
+class _FakeStateManager:
+    async def run(self, fn, *args):
+        return []
+
+
+class _FakeChannel:
+    id = 123
+    guild = None
+
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.files = []
+
+    async def send(self, **kwargs):
+        self.files.append(kwargs["file"])
+        if self.fail:
+            raise RuntimeError("send failed")
+        return MagicMock(id=1, content="hi", guild=None)
+
+
+@pytest.fixture
+def attachment(tmp_path, monkeypatch):
+    monkeypatch.setattr(api_server, "state_manager", _FakeStateManager())
+    path = tmp_path / "note.txt"
+    path.write_text("hello")
+    return str(path)
+
+
+async def test_attachment_closed_after_send(attachment):
+    channel = _FakeChannel()
+    actions = [{"type": "send_message", "content": "hi", "file_path": attachment}]
+    await api_server._execute_batch_actions(actions, channel, channel.id)
+
+    assert channel.files[0].fp.closed
+
+
+async def test_attachment_closed_when_send_fails(attachment):
+    channel = _FakeChannel(fail=True)
+    actions = [{"type": "send_message", "content": "hi", "file_path": attachment}]
+    with pytest.raises(RuntimeError):
+        await api_server._execute_batch_actions(actions, channel, channel.id)
+
+    assert channel.files[0].fp.closed
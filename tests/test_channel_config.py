@@ -4,7 +4,18 @@ Tests the actual _parse_channel_config method in WendyCog and the
 validate_channel_name function in paths.py.
 """
 
-from wendy.paths import validate_channel_name
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from wendy import paths
+from wendy.paths import (
+    files_beyond_newest,
+    files_by_mtime,
+    find_attachments_for_message,
+    find_attachments_for_messages,
+    validate_channel_name,
+    write_text_atomic,
+)
 
 
 # We can't instantiate WendyCog directly (requires Discord bot),
@@ -183,3 +194,77 @@ class TestLegacyWhitelistParsing:
                 pass
 
         assert channel_ids == [111, 333]
+
+
+class TestFindAttachments:
+    """Tests for the attachment directory lookups in paths.py."""
+
+    def test_buckets_by_message_id(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(paths, "attachments_dir", lambda name: tmp_path)
+        for name in ("msg_1_1_b.png", "msg_1_0_a.png", "msg_12_0_c.png", "msg_2_0_d.png", ".msg_1_2_e.png.part"):
+            (tmp_path / name).write_bytes(b"x")
+
+        found = find_attachments_for_messages([1, 12, 99], "chan")
+
+        assert found == {
+            1: [str(tmp_path / "msg_1_0_a.png"), str(tmp_path / "msg_1_1_b.png")],
+            12: [str(tmp_path / "msg_12_0_c.png")],
+        }
+        assert find_attachments_for_message(2, "chan") == [str(tmp_path / "msg_2_0_d.png")]
+
+    def test_missing_dir_or_channel(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(paths, "attachments_dir", lambda name: tmp_path / "missing")
+        assert find_attachments_for_messages([1], "chan") == {}
+        assert find_attachments_for_message(1, None) == []
+
+
+class TestFilesByMtime:
+    """Tests for files_by_mtime in paths.py."""
+
+    def test_filters_and_orders_oldest_first(self, tmp_path):
+        for i, name in enumerate(["b_2.json", "a_1.json", "c.txt", "agent_x.log"]):
+            path = tmp_path / name
+            path.write_text("x")
+            os.utime(path, (1000 + i, 1000 + i))
+        (tmp_path / "dir.json").mkdir()
+
+        found = files_by_mtime(tmp_path, suffix=".json")
+
+        assert [os.path.basename(p) for _, p in found] == ["b_2.json", "a_1.json"]
+        assert [os.path.basename(p) for _, p in files_by_mtime(tmp_path, prefix="agent_")] == ["agent_x.log"]
+
+    def test_files_beyond_newest_returns_only_the_excess(self, tmp_path):
+        for i in range(5):
+            path = tmp_path / f"agent_{i}.log"
+            path.write_text("x")
+            os.utime(path, (1000 - i, 1000 - i))  # agent_4 is oldest
+
+        excess = files_beyond_newest(tmp_path, 3, prefix="agent_", suffix=".log")
+
+        assert sorted(os.path.basename(p) for p in excess) == ["agent_3.log", "agent_4.log"]
+        assert files_beyond_newest(tmp_path, 5, suffix=".log") == []
+
+
+class TestWriteTextAtomic:
+    """Tests for write_text_atomic in paths.py."""
+
+    def test_concurrent_writers_never_leave_mixed_content(self, tmp_path):
+        target = tmp_path / "emoji_cache.json"
+        payloads = [str(i) * 200_000 for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda text: write_text_atomic(target, text), payloads * 4))
+
+        assert target.read_text() in payloads
+        assert os.listdir(tmp_path) == ["emoji_cache.json"]
+
+
+class TestChannelPathHelpers:
+    """Per-channel path helpers are memoised."""
+
+    def test_repeat_calls_return_same_path(self):
+        assert paths.channel_dir("general") is paths.channel_dir("general")
+        assert paths.session_dir("general") is paths.session_dir("general")
+
+    def test_derived_paths(self):
+        assert paths.beads_dir("general") == paths.CHANNELS_DIR / "general" / ".beads"
+        assert paths.session_dir("general").name == str(paths.CHANNELS_DIR / "general").replace("/", "-")
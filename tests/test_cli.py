@@ -1,7 +1,13 @@
 """Tests for wendy.cli."""
 from __future__ import annotations
 
+import asyncio
+import json
+
+from wendy import cli
 from wendy.cli import (
+    _trim_to_last_lines,
+    append_to_stream_log,
     build_cli_command,
     build_nudge_prompt,
     extract_forked_session_id,
@@ -147,3 +153,138 @@ def test_extract_forked_session_id_none():
         {"type": "assistant", "message": "hello"},
     ]
     assert extract_forked_session_id(events, "coding") is None
+
+
+# =========================================================================
+# Stream log trimming
+# =========================================================================
+
+
+def test_trim_to_last_lines_keeps_tail(tmp_path):
+    log = tmp_path / "stream.jsonl"
+    log.write_bytes(b"".join(f'{{"n": {i}}}\n'.encode() for i in range(50_000)))
+    _trim_to_last_lines(log, 100)
+    lines = log.read_bytes().splitlines()
+    assert len(lines) == 100
+    assert lines[0] == b'{"n": 49900}'
+    assert lines[-1] == b'{"n": 49999}'
+
+
+def test_trim_to_last_lines_retains_exact_bytes_of_long_log(tmp_path):
+    log = tmp_path / "stream.jsonl"
+    # Lines of uneven length so newlines land on both sides of block boundaries.
+    lines = [f'{{"n": {i}, "pad": "{"x" * (i % 3000)}"}}\n'.encode() for i in range(6000)]
+    log.write_bytes(b"".join(lines))
+    _trim_to_last_lines(log, 250)
+    assert log.read_bytes() == b"".join(lines[-250:])
+
+
+def test_trim_to_last_lines_noop_when_short(tmp_path):
+    log = tmp_path / "stream.jsonl"
+    log.write_bytes(b"a\nb\nc\n")
+    _trim_to_last_lines(log, 3)
+    assert log.read_bytes() == b"a\nb\nc\n"
+
+
+def test_append_to_stream_log_reuses_handle_across_trims(tmp_path, monkeypatch):
+    log = tmp_path / "logs" / "stream.jsonl"
+    monkeypatch.setattr(cli, "STREAM_LOG_FILE", log)
+    monkeypatch.setattr(cli, "MAX_STREAM_LOG_LINES", 2)
+    monkeypatch.setattr(cli, "_stream_log_fh", None)
+    monkeypatch.setattr(cli, "_stream_log_appended", None)
+
+    for i in range(3):
+        append_to_stream_log({"n": i}, 123)
+    handle = cli._stream_log_fh
+    cli.trim_stream_log()
+    append_to_stream_log({"n": 3}, 123)
+
+    assert cli._stream_log_fh is handle
+    lines = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [entry["event"]["n"] for entry in lines] == [1, 2, 3]
+    cli._close_stream_log()
+
+
+def test_append_to_stream_log_splices_raw_event(tmp_path, monkeypatch):
+    log = tmp_path / "stream.jsonl"
+    monkeypatch.setattr(cli, "STREAM_LOG_FILE", log)
+    monkeypatch.setattr(cli, "_stream_log_fh", None)
+
+    event = {"type": "assistant", "message": {"content": [{"text": "hi \u00e9"}]}}
+    append_to_stream_log(event, 123, raw=json.dumps(event))
+    append_to_stream_log(event, None)
+    cli._close_stream_log()
+
+    lines = log.read_text(encoding="utf-8").splitlines()
+    assert "\u00e9" in lines[1]  # written as UTF-8, not \u-escaped
+    spliced, encoded = (json.loads(line) for line in lines)
+    assert spliced["event"] == encoded["event"] == event
+    assert spliced["channel_id"] == "123"
+    assert encoded["channel_id"] is None
+
+
+async def test_append_to_stream_log_batches_writes_on_loop(tmp_path, monkeypatch):
+    log = tmp_path / "stream.jsonl"
+    monkeypatch.setattr(cli, "STREAM_LOG_FILE", log)
+    monkeypatch.setattr(cli, "_stream_log_fh", None)
+    monkeypatch.setattr(cli, "_STREAM_LOG_FLUSH_DELAY", 0.01)
+
+    append_to_stream_log({"n": 0}, 1)
+    append_to_stream_log({"n": 1}, 1)
+    assert not log.exists() or log.read_text() == ""
+
+    await asyncio.sleep(0.05)
+    assert [json.loads(line)["event"]["n"] for line in log.read_text().splitlines()] == [0, 1]
+    cli._close_stream_log()
+
+
+def test_trim_stream_log_waits_for_slack(tmp_path, monkeypatch):
+    log = tmp_path / "stream.jsonl"
+    monkeypatch.setattr(cli, "STREAM_LOG_FILE", log)
+    monkeypatch.setattr(cli, "MAX_STREAM_LOG_LINES", 20)
+    monkeypatch.setattr(cli, "_stream_log_fh", None)
+    monkeypatch.setattr(cli, "_stream_log_appended", 0)
+
+    for i in range(21):
+        append_to_stream_log({"n": i}, 1)
+    cli._stream_log_appended = 1  # below the 2-line slack for a cap of 20
+    cli.trim_stream_log()
+    assert len(log.read_text().splitlines()) == 21
+
+    cli._stream_log_appended = 2
+    cli.trim_stream_log()
+    assert len(log.read_text().splitlines()) == 20
+    assert cli._stream_log_appended == 0
+    cli._close_stream_log()
+
+
+# =========================================================================
+# Overloaded watcher
+# =========================================================================
+
+
+class _FakeProc:
+    returncode = None
+
+    def kill(self):
+        self.returncode = -9
+
+
+async def test_watch_session_kills_on_new_overloaded_error(tmp_path, monkeypatch):
+    session = tmp_path / "s.jsonl"
+    session.write_text('{"type": "overloaded_error"}\n')  # pre-existing, ignored
+    proc = _FakeProc()
+    killed = []
+    monkeypatch.setattr(cli, "_kill_process", lambda p: killed.append(p) or p.kill())
+
+    watcher = asyncio.create_task(cli._watch_session_for_overloaded(session, proc, poll_interval=0.01))
+    await asyncio.sleep(0.05)
+    assert not killed
+
+    with open(session, "a") as f:
+        f.write('{"error": {"type": "overloaded_')
+    await asyncio.sleep(0.03)
+    with open(session, "a") as f:
+        f.write('error"}}\n')
+    await asyncio.wait_for(watcher, 1)
+    assert killed == [proc]
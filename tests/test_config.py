@@ -65,3 +65,20 @@ def test_parse_channel_configs_missing_fields():
     with mock.patch.dict(os.environ, {"WENDY_CHANNEL_CONFIG": config_json}, clear=False):
         configs = parse_channel_configs()
         assert configs == {}
+
+
+def test_parse_channel_configs_returns_independent_copies():
+    config_json = '[{"id": "123", "name": "test", "ignore_user_ids": ["7"]}]'
+    with mock.patch.dict(os.environ, {"WENDY_CHANNEL_CONFIG": config_json}, clear=False):
+        first = parse_channel_configs()
+        first[123]["_is_thread"] = True
+        second = parse_channel_configs()
+        assert "_is_thread" not in second[123]
+        assert 7 in second[123]["ignore_user_ids"]
+
+
+def test_parse_channel_configs_reparses_on_env_change():
+    with mock.patch.dict(os.environ, {"WENDY_CHANNEL_CONFIG": '[{"id": "1", "name": "a"}]'}, clear=False):
+        assert list(parse_channel_configs()) == [1]
+    with mock.patch.dict(os.environ, {"WENDY_CHANNEL_CONFIG": '[{"id": "2", "name": "b"}]'}, clear=False):
+        assert list(parse_channel_configs()) == [2]
@@ -0,0 +1,82 @@
+"""Tests for wendy.discord_client helpers."""
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import aiohttp
+import pytest
+
+from wendy import discord_client
+from wendy.discord_client import _retry_delay
+
+
+def _response_error(status: int, headers: dict | None = None) -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(MagicMock(), (), status=status, headers=headers)
+
+
+def test_retry_delay_honours_retry_after():
+    assert _retry_delay(_response_error(429, {"Retry-After": "2.5"}), 0) == 2.5
+    assert _retry_delay(_response_error(429, {"Retry-After": "999"}), 0) == discord_client._ATTACHMENT_MAX_BACKOFF
+
+
+def test_retry_delay_backs_off_exponentially():
+    assert 4 <= _retry_delay(_response_error(503), 2) < 5
+
+
+async def test_fetch_with_retry_retries_transient_errors(monkeypatch, tmp_path):
+    client = MagicMock()
+    statuses = [503, 429]
+
+    async def fake_stream(url, filepath):
+        if statuses:
+            raise _response_error(statuses.pop(0))
+        return 42
+
+    client._stream_to_file = fake_stream
+    monkeypatch.setattr(discord_client, "_retry_delay", lambda error, attempt: 0)
+    fetch = discord_client.WendyBot._fetch_with_retry
+
+    assert await fetch(client, "https://cdn/x", tmp_path / "x") == 42
+
+    statuses[:] = [404]
+    with pytest.raises(aiohttp.ClientResponseError):
+        await fetch(client, "https://cdn/x", tmp_path / "x")
+
+
+async def test_stream_to_file_batches_disk_writes(monkeypatch, tmp_path):
+    chunks = [b"x" * 1000] * 5
+    monkeypatch.setattr(discord_client, "_ATTACHMENT_FLUSH_SIZE", 2000)
+
+    class _Content:
+        async def iter_chunked(self, size):
+            for chunk in chunks:
+                yield chunk
+
+    class _Response:
+        content = _Content()
+
+        def raise_for_status(self):
+            pass
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    client = MagicMock()
+    client._http_session.get.return_value = _Response()
+    writes = []
+    real_to_thread = discord_client.asyncio.to_thread
+
+    async def counting_to_thread(fn, *args):
+        if getattr(fn, "__name__", "") == "write":
+            writes.append(len(args[0]))
+        return await real_to_thread(fn, *args)
+
+    monkeypatch.setattr(discord_client.asyncio, "to_thread", counting_to_thread)
+    target = tmp_path / "a.bin"
+
+    assert await discord_client.WendyBot._stream_to_file(client, "https://cdn/a", target) == 5000
+    assert writes == [2000, 2000, 1000]
+    assert target.read_bytes() == b"x" * 5000
@@ -129,6 +129,26 @@ def test_insert_message_ignores_duplicate(tmp_path):
     assert msgs[0]["content"] == "original"
 
 
+def test_insert_messages_batch(tmp_path):
+    sm = _make_sm(tmp_path)
+    sm.insert_messages([
+        (1001, 123, 1, 42, "alice", 0, 0, "hello", 1000, None, None),
+        (1002, 123, 1, 43, "bob", 0, 0, "world", 1001, None, None),
+        (1001, 123, 1, 42, "alice", 0, 0, "duplicate", 1000, None, None),
+    ])
+
+    msgs = sm.get_recent_messages(123)
+    assert [m["content"] for m in msgs] == ["hello", "world"]
+
+
+def test_cached_messages_view_reads_message_history(tmp_path):
+    sm = _make_sm(tmp_path)
+    sm.insert_messages([(1001, 123, 1, 42, "alice", 0, 0, "hello", 1000, None, None)])
+
+    row = sm._get_conn().execute("SELECT author_name, content FROM cached_messages").fetchone()
+    assert tuple(row) == ("alice", "hello")
+
+
 def test_insert_message_webhook(tmp_path):
     sm = _make_sm(tmp_path)
     sm.insert_message(
@@ -167,6 +187,31 @@ def test_delete_messages(tmp_path):
     assert msgs[0]["content"] == "msg1"
 
 
+def test_consume_messages_advances_watermark_and_deletes(tmp_path):
+    sm = _make_sm(tmp_path)
+    sm.insert_messages([
+        (1000, 123, 1, 42, "alice", 0, 0, "hello", 1000, None, None),
+        (9_000_000_000_000_000_001, 123, 1, 0, "System", 1, 0, "nudge", 1001, None, None),
+    ])
+
+    sm.consume_messages(123, 1000, [9_000_000_000_000_000_001])
+
+    assert sm.get_last_seen(123) == 1000
+    assert [r["message_id"] for r in sm.fetch_messages(123)] == [1000]
+
+
+def test_store_notification_messages_marks_seen(tmp_path):
+    sm = _make_sm(tmp_path)
+    nid = sm.add_notification(type="task_completion", source="orchestrator", title="done", channel_id=123)
+
+    sm.store_notification_messages(
+        [(9_000_000_000_000_000_002, 123, None, 0, "Task", 1, 0, "done", 1000, None, None)], [nid],
+    )
+
+    assert sm.get_unseen_notifications_for_wendy() == []
+    assert [r["content"] for r in sm.fetch_messages(123)] == ["done"]
+
+
 def test_delete_messages_empty_list(tmp_path):
     sm = _make_sm(tmp_path)
     sm.delete_messages([])  # should not crash
@@ -208,6 +253,19 @@ def test_mark_notifications_seen(tmp_path):
     assert len(sm.get_unseen_notifications_for_proxy()) == 0
 
 
+def test_claim_notifications_for_proxy(tmp_path):
+    sm = _make_sm(tmp_path)
+    first = sm.add_notification(type="test", source="test", title="first")
+    second = sm.add_notification(type="test", source="test", title="second")
+
+    claimed = sm.claim_notifications_for_proxy()
+    assert [n.id for n in claimed] == [first, second]
+    assert all(n.seen_by_proxy for n in claimed)
+    assert sm.claim_notifications_for_proxy() == []
+    # The Wendy-side flag is untouched.
+    assert len(sm.get_unseen_notifications_for_wendy()) == 2
+
+
 def test_mark_notifications_seen_empty_list(tmp_path):
     sm = _make_sm(tmp_path)
     sm.mark_notifications_seen_by_wendy([])  # should not crash
@@ -226,6 +284,17 @@ def test_cleanup_old_notifications(tmp_path):
     assert count == 2
 
 
+def test_cleanup_old_notifications_keeps_newest(tmp_path):
+    sm = _make_sm(tmp_path)
+    for i in range(5):
+        sm.add_notification(type="test", source="test", title=f"notif-{i}")
+
+    sm.cleanup_old_notifications(keep_count=10)
+    sm.cleanup_old_notifications(keep_count=3)
+    titles = [row[0] for row in sm._get_conn().execute("SELECT title FROM notifications ORDER BY id")]
+    assert titles == ["notif-2", "notif-3", "notif-4"]
+
+
 # =========================================================================
 # Thread registry
 # =========================================================================
@@ -239,6 +308,17 @@ def test_register_and_get_thread(tmp_path):
     assert sm.get_thread_parent(999) == 123
 
 
+def test_get_thread_folder_is_cached(tmp_path):
+    sm = _make_sm(tmp_path)
+    sm.register_thread(thread_id=999, parent_channel_id=123, folder_name="general_t_999")
+    assert sm.get_thread_folder(999) == "general_t_999"
+
+    conn = sm._get_conn()
+    conn.execute("DELETE FROM thread_registry")
+    conn.commit()
+    assert sm.get_thread_folder(999) == "general_t_999"
+
+
 def test_get_thread_missing(tmp_path):
     sm = _make_sm(tmp_path)
     assert sm.get_thread_folder(999) is None
@@ -321,3 +401,62 @@ def test_usage_state(tmp_path):
 
     sm.set_usage_threshold("test_key", 100)
     assert sm.get_usage_threshold("test_key") == 100
+
+
+async def test_run_uses_single_db_thread(tmp_path):
+    import threading
+
+    sm = _make_sm(tmp_path)
+    names = {await sm.run(lambda: threading.current_thread().name) for _ in range(5)}
+    await sm.run(
+        sm.insert_message,
+        message_id=1001, channel_id=123, guild_id=1,
+        author_id=42, author_nickname="alice", is_bot=False,
+        content="hello", timestamp=1000,
+    )
+    sm.close()
+
+    assert len(names) == 1
+    assert names.pop().startswith("wendy-db")
+    assert sm.get_recent_messages(123)[0]["content"] == "hello"
+
+
+def test_schema_version_recorded_and_ddl_skipped(tmp_path):
+    from wendy.state import _SCHEMA_VERSION
+
+    sm = _make_sm(tmp_path)
+    conn = sm._get_conn()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == _SCHEMA_VERSION
+
+    # A second manager on the same file sees the version and runs no DDL.
+    conn.execute("DROP TABLE bash_tool_log")
+    conn.commit()
+    sm2 = StateManager(db_path=tmp_path / "test.db")
+    tables = {r[0] for r in sm2._get_conn().execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert "bash_tool_log" not in tables
+    assert "message_history" in tables
+
+
+def test_checkpoint_truncates_large_wal(tmp_path):
+    sm = _make_sm(tmp_path)
+    sm.update_last_seen(1, 100)
+    wal = tmp_path / "test.db-wal"
+    assert wal.stat().st_size > 0
+
+    busy, _, _ = sm.checkpoint(truncate_over=0)
+    assert busy == 0
+    assert wal.stat().st_size == 0
+    assert sm.get_last_seen(1) == 100
+
+
+def test_checkpoint_is_passive_below_truncate_threshold(tmp_path):
+    sm = _make_sm(tmp_path)
+    sm.update_last_seen(1, 100)
+    wal = tmp_path / "test.db-wal"
+    size = wal.stat().st_size
+
+    busy, frames, done = sm.checkpoint()
+    assert busy == 0
+    assert frames == done
+    assert wal.stat().st_size == size  # copied back, but the file is not truncated
+    assert sm._get_conn().execute("PRAGMA busy_timeout").fetchone()[0] == 30000
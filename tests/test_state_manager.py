@@ -319,3 +319,14 @@ class TestThreadSafety:
         session = state_manager.get_session(channel_id)
         assert session.message_count == 500
         assert session.total_input_tokens == 500
+
+
+class TestConnectionPragmas:
+    """Tests for per-connection SQLite tuning."""
+
+    def test_connection_uses_wal_and_normal_sync(self, state_manager):
+        """New connections run in WAL mode with synchronous=NORMAL."""
+        conn = state_manager._get_conn()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        # 1 == NORMAL
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
@@ -0,0 +1,262 @@
+"""Tests for wendy.tasks."""
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from wendy import tasks
+from wendy.tasks import _RUNNER_ENV_SPEC, ChannelBeads, RunnerConfig, TaskRunner, _close_log_file
+
+
+def test_runner_config_defaults():
+    with mock.patch.dict(os.environ, {}, clear=True):
+        cfg = RunnerConfig.from_env()
+    assert cfg.concurrency == 3
+    assert cfg.poll_interval == 30
+    assert cfg.notify_channel_id is None
+    assert cfg.agent_system_prompt_file == Path("/app/config/agent_claude_md.txt")
+
+
+def test_runner_config_from_env():
+    env = {"ORCHESTRATOR_CONCURRENCY": "1", "ORCHESTRATOR_NOTIFY_CHANNEL": "12345"}
+    with mock.patch.dict(os.environ, env, clear=True):
+        cfg = RunnerConfig.from_env()
+    assert cfg.concurrency == 1
+    assert cfg.notify_channel_id == 12345
+
+
+def test_runner_config_is_frozen():
+    cfg = RunnerConfig.from_env()
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        cfg.concurrency = 99
+
+
+def test_runner_env_spec_covers_every_field():
+    assert [spec[0] for spec in _RUNNER_ENV_SPEC] == [f.name for f in dataclasses.fields(RunnerConfig)]
+
+
+def _runner_with_channel(tmp_path, monkeypatch) -> tuple[TaskRunner, ChannelBeads, list]:
+    monkeypatch.setattr(tasks, "LOG_DIR", tmp_path / "logs")
+    beads = tmp_path / ".beads"
+    beads.mkdir()
+    (beads / "config.yaml").write_text("x")
+    channel = ChannelBeads(
+        name="general", beads_path=beads,
+        session_path=tmp_path / "sessions", current_session_path=tmp_path / ".current_session",
+    )
+    runner = TaskRunner()
+    calls = []
+
+    async def fake_run_bd(cmd, channel_name, timeout=30):
+        calls.append(cmd)
+        return 0, b'[{"id": "t-1", "title": "Task"}]', ""
+
+    monkeypatch.setattr(runner, "_run_bd", fake_run_bd)
+    return runner, channel, calls
+
+
+async def test_ready_tasks_cached_until_beads_dir_changes(tmp_path, monkeypatch):
+    runner, channel, calls = _runner_with_channel(tmp_path, monkeypatch)
+
+    first = await runner._get_ready_tasks(channel)
+    second = await runner._get_ready_tasks(channel)
+    assert first == second == [{"id": "t-1", "title": "Task", "_channel_name": "general"}]
+    assert len(calls) == 1
+
+    (channel.beads_path / "beads.db").write_bytes(b"changed")
+    await runner._get_ready_tasks(channel)
+    assert len(calls) == 2
+
+
+def _fake_agent(started_at, closed_detected_at=None) -> tasks.RunningAgent:
+    return tasks.RunningAgent(
+        task_id="t-1", title="Task", channel_name="general",
+        process=mock.Mock(returncode=None), started_at=started_at,
+        log_path=Path("/dev/null"), closed_detected_at=closed_detected_at,
+    )
+
+
+def test_next_poll_delay_idle_is_poll_interval(tmp_path, monkeypatch):
+    runner, _, _ = _runner_with_channel(tmp_path, monkeypatch)
+    assert runner._next_poll_delay() == tasks.POLL_INTERVAL
+
+
+def test_next_poll_delay_short_during_burst(tmp_path, monkeypatch):
+    runner, _, _ = _runner_with_channel(tmp_path, monkeypatch)
+    runner._burst = 1
+    assert runner._next_poll_delay() == tasks.POLL_MIN_WAIT
+    runner._burst = tasks.POLL_BUDGET + 1
+    assert runner._next_poll_delay() == tasks.POLL_INTERVAL
+
+
+def test_next_poll_delay_waits_for_closed_grace_period(tmp_path, monkeypatch):
+    runner, _, _ = _runner_with_channel(tmp_path, monkeypatch)
+    now = datetime.now()
+    runner.agents["t-1"] = _fake_agent(now, closed_detected_at=now)
+    assert runner._next_poll_delay() <= tasks.CLOSED_TASK_GRACE_PERIOD
+
+
+async def test_dispatch_fetches_channels_together_and_caps_spawns(tmp_path, monkeypatch):
+    runner, channel, _ = _runner_with_channel(tmp_path, monkeypatch)
+    other = dataclasses.replace(channel, name="other")
+    runner.beads_channels = [channel, other]
+    monkeypatch.setattr(tasks, "CONCURRENCY", 2)
+    in_flight = []
+
+    async def fake_ready(ch):
+        in_flight.append(ch.name)
+        await asyncio.sleep(0)
+        assert len(in_flight) == 2  # both fetches started before either finished
+        return [{"id": f"{ch.name}-{i}"} for i in range(2)]
+
+    async def fake_claim(task_id, channel_name):
+        return True
+
+    async def fake_spawn(task, ch):
+        return _fake_agent(datetime.now())
+
+    monkeypatch.setattr(runner, "_get_ready_tasks", fake_ready)
+    monkeypatch.setattr(runner, "_claim_task", fake_claim)
+    monkeypatch.setattr(runner, "_spawn_agent", fake_spawn)
+
+    assert await runner._dispatch_ready_tasks() == 2
+    assert sorted(runner.agents) == ["general-0", "general-1"]
+    assert await runner._dispatch_ready_tasks() == 0
+
+
+def test_agent_system_prompt_reread_only_on_mtime_change(tmp_path, monkeypatch):
+    prompt = tmp_path / "agent.txt"
+    prompt.write_text("  be brief  \n")
+    os.utime(prompt, ns=(1_000_000_000, 1_000_000_000))
+    monkeypatch.setattr(tasks, "AGENT_SYSTEM_PROMPT_FILE", prompt)
+    monkeypatch.setattr(tasks, "_agent_prompt_cache", None)
+
+    assert tasks._agent_system_prompt() == "be brief"
+    with mock.patch.object(Path, "read_text", side_effect=AssertionError("re-read")):
+        assert tasks._agent_system_prompt() == "be brief"
+
+    prompt.write_text("be thorough")
+    os.utime(prompt, ns=(2_000_000_000, 2_000_000_000))
+    assert tasks._agent_system_prompt() == "be thorough"
+
+
+def test_agent_system_prompt_reread_after_edit_with_same_mtime(tmp_path, monkeypatch):
+    prompt = tmp_path / "agent.txt"
+    prompt.write_text("be brief")
+    os.utime(prompt, ns=(1_000_000_000, 1_000_000_000))
+    monkeypatch.setattr(tasks, "AGENT_SYSTEM_PROMPT_FILE", prompt)
+    monkeypatch.setattr(tasks, "_agent_prompt_cache", None)
+    assert tasks._agent_system_prompt() == "be brief"
+
+    # Coarse-mtime filesystems can leave the timestamp unchanged across an edit.
+    prompt.write_text("be much more thorough")
+    os.utime(prompt, ns=(1_000_000_000, 1_000_000_000))
+    assert tasks._agent_system_prompt() == "be much more thorough"
+
+
+def test_agent_system_prompt_missing_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(tasks, "AGENT_SYSTEM_PROMPT_FILE", tmp_path / "missing.txt")
+    monkeypatch.setattr(tasks, "_agent_prompt_cache", None)
+    assert tasks._agent_system_prompt() == ""
+
+
+async def test_check_closed_tasks_uses_one_listing_per_channel(tmp_path, monkeypatch):
+    runner, channel, calls = _runner_with_channel(tmp_path, monkeypatch)
+    runner.beads_channels = [channel]
+    for task_id in ("t-1", "t-2"):
+        runner.agents[task_id] = dataclasses.replace(_fake_agent(datetime.now()), task_id=task_id)
+
+    async def fake_run_bd(cmd, channel_name, timeout=30):
+        calls.append(cmd)
+        return 0, b'[{"id": "t-1", "status": "closed"}, {"id": "t-2", "status": "in_progress"}]', ""
+
+    monkeypatch.setattr(runner, "_run_bd", fake_run_bd)
+    await runner._check_closed_tasks()
+
+    assert calls == [["bd", "list", "--json"]]
+    assert runner.agents["t-1"].closed_detected_at is not None
+    assert runner.agents["t-2"].closed_detected_at is None
+
+
+async def test_agent_exit_wakes_poll_loop(tmp_path, monkeypatch):
+    runner, _, _ = _runner_with_channel(tmp_path, monkeypatch)
+    exited = asyncio.Event()
+
+    class _Proc:
+        async def wait(self):
+            await exited.wait()
+            return 0
+
+    runner._watch_exit(_Proc())
+    await asyncio.sleep(0)
+    assert not runner._wake.is_set()
+
+    exited.set()
+    await asyncio.wait_for(runner._wake.wait(), 1)
+    assert not runner._exit_watchers or all(t.done() for t in runner._exit_watchers)
+
+
+def test_agent_allowed_tools_scopes_writes_to_channel():
+    assert tasks._agent_allowed_tools("general") == (
+        "Read,WebSearch,WebFetch,Bash,Glob,Grep,TodoWrite,"
+        "Edit(//data/wendy/channels/general/**),Write(//data/wendy/channels/general/**),"
+        "Edit(//data/wendy/claude_fragments/people/**),Write(//data/wendy/claude_fragments/people/**),"
+        "Write(//data/wendy/tmp/**),Write(//tmp/**)"
+    )
+
+
+async def test_reopened_task_clears_closed_detection(tmp_path, monkeypatch):
+    runner, channel, _ = _runner_with_channel(tmp_path, monkeypatch)
+    runner.beads_channels = [channel]
+    agent = _fake_agent(datetime.now(), closed_detected_at=datetime.now() - timedelta(seconds=60))
+    runner.agents["t-1"] = agent
+
+    async def fake_run_bd(cmd, channel_name, timeout=30):
+        return 0, b'[{"id": "t-1", "status": "in_progress"}]', ""
+
+    monkeypatch.setattr(runner, "_run_bd", fake_run_bd)
+    await runner._check_closed_tasks()
+
+    assert agent.closed_detected_at is None
+    assert runner._next_poll_delay() == tasks.POLL_INTERVAL
+
+
+def test_next_poll_delay_floors_expired_grace_period(tmp_path, monkeypatch):
+    runner, _, _ = _runner_with_channel(tmp_path, monkeypatch)
+    runner.agents["t-1"] = _fake_agent(datetime.now(), closed_detected_at=datetime.now() - timedelta(seconds=60))
+    assert runner._next_poll_delay() == tasks.POLL_MIN_WAIT
+
+
+async def test_spawn_agent_passes_braces_in_title_verbatim(tmp_path, monkeypatch):
+    runner, channel, _ = _runner_with_channel(tmp_path, monkeypatch)
+    monkeypatch.setattr(tasks, "AGENT_SYSTEM_PROMPT_FILE", tmp_path / "missing.txt")
+    monkeypatch.setattr(tasks, "_agent_prompt_cache", None)
+    spawned = []
+
+    class _Proc:
+        returncode = None
+
+        async def wait(self):
+            return 0
+
+    async def fake_exec(*cmd, **kwargs):
+        spawned.append(cmd)
+        return _Proc()
+
+    monkeypatch.setattr(tasks.asyncio, "create_subprocess_exec", fake_exec)
+    task = {"id": "t-1", "title": "{task_id} {x}", "description": "use {{braces}} and {y}", "labels": []}
+
+    agent = await runner._spawn_agent(task, channel)
+
+    assert agent is not None
+    prompt = spawned[0][spawned[0].index("-p") + 1]
+    assert "TITLE: {task_id} {x}\n" in prompt
+    assert "use {{braces}} and {y}" in prompt
+    assert "TASK ID: t-1\n" in prompt
+    _close_log_file(agent)
@@ -18,11 +18,13 @@ Route overview (see ``create_app`` for the full route table):
 """
 from __future__ import annotations
 
+import asyncio
 import base64
 import json
 import logging
 import os
 import re
+import stat
 import subprocess
 import tempfile
 from pathlib import Path
@@ -37,7 +39,7 @@ from .config import (
     MAX_MESSAGE_LIMIT,
     SYNTHETIC_ID_THRESHOLD,
 )
-from .paths import SHARED_DIR, WENDY_BASE, find_attachments_for_message
+from .paths import SHARED_DIR, WENDY_BASE, find_attachments_for_messages
 from .state import state as state_manager
 
 if TYPE_CHECKING:
@@ -51,6 +53,14 @@ _channel_configs: dict[int, dict] = {}
 # Discord bot reference (set by discord_client at startup)
 _discord_bot: discord.Client | None = None
 
+# Outbound HTTP session shared by the wendy-web and Gemini proxies, so
+# repeat calls reuse pooled keep-alive connections (closed on app cleanup).
+_client_session: aiohttp.ClientSession | None = None
+
+# Upload limit outside boosted guilds (and in DMs); guild channels use the
+# guild's own ``filesize_limit``.
+_DEFAULT_FILESIZE_LIMIT = 10 * 1024 * 1024
+
 
 def set_discord_bot(bot: discord.Client) -> None:
     """Store a reference to the Discord bot so route handlers can send messages."""
@@ -58,6 +68,22 @@ def set_discord_bot(bot: discord.Client) -> None:
     _discord_bot = bot
 
 
+def _get_client_session() -> aiohttp.ClientSession:
+    """Return the shared outbound ``ClientSession``, creating it on first use."""
+    global _client_session
+    if _client_session is None or _client_session.closed:
+        _client_session = aiohttp.ClientSession()
+    return _client_session
+
+
+async def _close_client_session(app: web.Application) -> None:
+    """``on_cleanup`` hook: close the shared outbound session."""
+    global _client_session
+    if _client_session is not None:
+        await _client_session.close()
+        _client_session = None
+
+
 def set_channel_configs(configs: dict[int, dict]) -> None:
     """Update the channel configuration lookup (called on startup and config reload)."""
     global _channel_configs
@@ -93,46 +119,56 @@ def check_for_new_messages(channel_id: int) -> list[dict]:
     )
 
 
-def _save_bot_message(msg: discord.Message | None, channel_id: int) -> None:
-    """Persist a bot-sent Discord message to SQLite for history and check_messages visibility."""
-    if not msg:
-        return
+def _bot_message_row(msg: discord.Message, channel_id: int) -> tuple:
+    """Build the ``message_history`` row for a bot-sent Discord message."""
+    return (
+        msg.id, channel_id, msg.guild.id if msg.guild else None, msg.author.id,
+        msg.author.display_name, 1, 0, msg.content or "", int(msg.created_at.timestamp()), None, None,
+    )
+
+
+def _save_bot_messages(rows: list[tuple]) -> None:
+    """Persist bot-sent message rows in one transaction for history and check_messages visibility."""
     try:
-        state_manager.insert_message(
-            message_id=msg.id,
-            channel_id=channel_id,
-            guild_id=msg.guild.id if msg.guild else None,
-            author_id=msg.author.id,
-            author_nickname=msg.author.display_name,
-            is_bot=True,
-            content=msg.content or "",
-            timestamp=int(msg.created_at.timestamp()),
-        )
+        state_manager.insert_messages(rows)
     except Exception as e:
-        _LOG.warning("Failed to save bot message %s: %s", msg.id, e)
+        _LOG.warning("Failed to save %d bot message(s): %s", len(rows), e)
 
 
-def _validate_attachment_path(path_str: str) -> str | None:
-    """Validate that *path_str* lives under an allowed directory and exists.
+def _validate_attachment(path_str: str, max_bytes: int) -> tuple[Path | None, str | None]:
+    """Validate that *path_str* lives under an allowed directory and fits *max_bytes*.
 
-    Returns an error string on failure, or ``None`` when valid.
+    Returns ``(resolved_path, None)`` when valid, or ``(None, error_string)``.
 
     Uses Path.resolve() so that symlinks are fully expanded before the
     allowed-parent check: a symlink pointing outside the allowed tree will
-    resolve to its real target and be caught here.
+    resolve to its real target and be caught here. A single ``os.stat``
+    covers both the existence and the size check, so files over *max_bytes*
+    are rejected without being opened.
     """
     att_path = Path(path_str).resolve()
     allowed_parents = [WENDY_BASE.resolve(), Path("/tmp").resolve()]
     if not any(att_path.is_relative_to(parent) for parent in allowed_parents):
-        return f"Attachment must be in {WENDY_BASE}/ or /tmp/, got: {path_str}"
-    if not att_path.exists():
-        return f"Attachment file not found: {path_str}"
-    return None
+        return None, f"Attachment must be in {WENDY_BASE}/ or /tmp/, got: {path_str}"
+    try:
+        st = os.stat(att_path)
+    except FileNotFoundError:
+        return None, f"Attachment file not found: {path_str}"
+    if not stat.S_ISREG(st.st_mode):
+        return None, f"Attachment file not found: {path_str}"
+    if st.st_size > max_bytes:
+        _LOG.warning("Rejected oversized attachment %s (%d bytes)", att_path, st.st_size)
+        return None, (
+            f"Attachment too large ({st.st_size / 1024 / 1024:.1f}MB). "
+            f"Discord limit here is {max_bytes / 1024 / 1024:.0f}MB."
+        )
+    return att_path, None
 
 
 def _build_discord_send_kwargs(
     body: dict,
     channel_id: int,
+    filesize_limit: int = _DEFAULT_FILESIZE_LIMIT,
 ) -> tuple[dict, str | None]:
     """Build ``channel.send()`` keyword arguments from a request body.
 
@@ -148,25 +184,56 @@ def _build_discord_send_kwargs(
     if len(text) > DISCORD_MAX_MESSAGE_LENGTH:
         return {}, f"Message too long ({len(text)} chars). Discord limit is {DISCORD_MAX_MESSAGE_LENGTH}."
 
-    att_path = body.get("file_path") or body.get("attachment")
-    if att_path:
-        err = _validate_attachment_path(att_path)
-        if err:
-            return {}, err
-
     kwargs: dict = {"content": text or None}
-    if att_path:
-        kwargs["file"] = _discord.File(att_path)
-
     reply_to = body.get("reply_to")
     if reply_to:
+        try:
+            message_id = reply_to if isinstance(reply_to, int) else int(reply_to)
+        except (TypeError, ValueError):
+            return {}, f"Invalid reply_to: {reply_to!r}"
         kwargs["reference"] = _discord.MessageReference(
-            message_id=int(reply_to), channel_id=channel_id,
+            message_id=message_id, channel_id=channel_id,
         )
 
+    # Opened last so no earlier validation error can leak the handle. Given a
+    # path, discord.File owns the handle, so _close_send_files() closes it.
+    att_path = body.get("file_path") or body.get("attachment")
+    if att_path:
+        resolved, err = _validate_attachment(att_path, filesize_limit)
+        if err:
+            return {}, err
+        kwargs["file"] = _discord.File(str(resolved), filename=Path(att_path).name)
+
     return kwargs, None
 
 
+def _close_send_files(kwargs: dict) -> None:
+    """Close the attachment opened by :func:`_build_discord_send_kwargs`, if any."""
+    file = kwargs.get("file")
+    if file is not None:
+        file.close()
+
+
+def _filesize_limit(channel: discord.abc.Messageable) -> int:
+    """Return the upload size limit in bytes for *channel*."""
+    guild = getattr(channel, "guild", None)
+    return guild.filesize_limit if guild is not None else _DEFAULT_FILESIZE_LIMIT
+
+
+async def _prepare_send_kwargs(body: dict, channel: discord.abc.Messageable) -> tuple[dict, str | None]:
+    """Async wrapper for :func:`_build_discord_send_kwargs`.
+
+    With an attachment, the path resolve and the file open are blocking
+    disk I/O, so the build runs in a worker thread. Text-only sends are
+    built inline.
+    """
+    if body.get("file_path") or body.get("attachment"):
+        return await asyncio.to_thread(
+            _build_discord_send_kwargs, body, channel.id, _filesize_limit(channel),
+        )
+    return _build_discord_send_kwargs(body, channel.id)
+
+
 # ---------------------------------------------------------------------------
 # Route handlers
 # ---------------------------------------------------------------------------
@@ -197,41 +264,50 @@ async def _execute_batch_actions(
     Returns a JSON response with per-action results.
     """
     results: list[dict] = []
-    for i, action in enumerate(actions):
-        action_type = action.get("type")
-
-        if action_type == "send_message":
-            kwargs, err = _build_discord_send_kwargs(action, channel_id)
-            if err:
-                return web.json_response({"error": f"Action {i}: {err}"}, status=400)
-            sent_msg = await channel.send(**kwargs)
-            _save_bot_message(sent_msg, channel_id)
-            results.append({
-                "action": i, "type": "send_message", "success": True,
-                "message_id": sent_msg.id, "content": sent_msg.content or "",
-            })
-
-        elif action_type == "add_reaction":
-            msg_id = action.get("message_id")
-            emoji = action.get("emoji")
-            if not msg_id or not emoji:
+    sent_rows: list[tuple] = []
+    try:
+        for i, action in enumerate(actions):
+            action_type = action.get("type")
+
+            if action_type == "send_message":
+                kwargs, err = await _prepare_send_kwargs(action, channel)
+                if err:
+                    return web.json_response({"error": f"Action {i}: {err}"}, status=400)
+                try:
+                    sent_msg = await channel.send(**kwargs)
+                finally:
+                    _close_send_files(kwargs)
+                sent_rows.append(_bot_message_row(sent_msg, channel_id))
+                results.append({
+                    "action": i, "type": "send_message", "success": True,
+                    "message_id": sent_msg.id, "content": sent_msg.content or "",
+                })
+
+            elif action_type == "add_reaction":
+                msg_id = action.get("message_id")
+                emoji = action.get("emoji")
+                if not msg_id or not emoji:
+                    return web.json_response(
+                        {"error": f"Action {i}: add_reaction requires message_id and emoji"},
+                        status=400,
+                    )
+                try:
+                    # A partial message is enough to react; no need to fetch it first.
+                    await channel.get_partial_message(int(msg_id)).add_reaction(emoji)
+                    results.append({"action": i, "type": "add_reaction", "success": True})
+                except Exception as e:
+                    results.append({"action": i, "type": "add_reaction", "error": str(e)})
+
+            else:
                 return web.json_response(
-                    {"error": f"Action {i}: add_reaction requires message_id and emoji"},
-                    status=400,
+                    {"error": f"Action {i}: unknown type '{action_type}'"}, status=400,
                 )
-            try:
-                msg = await channel.fetch_message(int(msg_id))
-                await msg.add_reaction(emoji)
-                results.append({"action": i, "type": "add_reaction", "success": True})
-            except Exception as e:
-                results.append({"action": i, "type": "add_reaction", "error": str(e)})
-
-        else:
-            return web.json_response(
-                {"error": f"Action {i}: unknown type '{action_type}'"}, status=400,
-            )
+    finally:
+        # One insert for every message sent, even if a later action failed.
+        if sent_rows:
+            await state_manager.run(_save_bot_messages, sent_rows)
 
-    new_messages = check_for_new_messages(channel_id)
+    new_messages = await state_manager.run(check_for_new_messages, channel_id)
     return web.json_response({"success": True, "results": results, "new_messages": new_messages})
 
 
@@ -254,7 +330,7 @@ async def handle_send_message(request: web.Request) -> web.Response:
 
     # Interrupt system: surface unseen messages before allowing a send.
     if not body.get("force", False):
-        new_messages = check_for_new_messages(channel_id)
+        new_messages = await state_manager.run(check_for_new_messages, channel_id)
         if new_messages:
             return web.json_response({
                 "error": "New messages received since your last check. Review them and retry.",
@@ -280,13 +356,16 @@ async def handle_send_message(request: web.Request) -> web.Response:
         return await _execute_batch_actions(actions, channel, channel_id)
 
     # Single message mode
-    kwargs, err = _build_discord_send_kwargs(body, channel_id)
+    kwargs, err = await _prepare_send_kwargs(body, channel)
     if err:
         return web.json_response({"error": err}, status=400)
 
-    sent_msg = await channel.send(**kwargs)
-    _save_bot_message(sent_msg, channel_id)
-    new_messages = check_for_new_messages(channel_id)
+    try:
+        sent_msg = await channel.send(**kwargs)
+    finally:
+        _close_send_files(kwargs)
+    await state_manager.run(_save_bot_messages, [_bot_message_row(sent_msg, channel_id)])
+    new_messages = await state_manager.run(check_for_new_messages, channel_id)
     resp_body: dict = {
         "success": True,
         "message": "Message sent",
@@ -302,18 +381,10 @@ async def handle_send_message(request: web.Request) -> web.Response:
     return web.json_response(resp_body)
 
 
-def _delete_synthetic_messages(synthetic_ids: list[int]) -> None:
-    """Delete consumed synthetic messages from the database."""
-    state_manager.delete_messages(synthetic_ids)
-
-
 def _collect_task_updates() -> list[dict]:
     """Consume unseen task-completion notifications and return them as dicts."""
-    unseen = state_manager.get_unseen_notifications_for_proxy()
-    notification_ids: list[int] = []
     task_updates: list[dict] = []
-    for n in unseen:
-        notification_ids.append(n.id)
+    for n in state_manager.claim_notifications_for_proxy():
         if n.type == "task_completion" and n.payload:
             task_updates.append({
                 "task_id": n.payload.get("task_id", "unknown"),
@@ -322,8 +393,6 @@ def _collect_task_updates() -> list[dict]:
                 "duration": n.payload.get("duration", "unknown"),
                 "completed_at": n.created_at,
             })
-    if notification_ids:
-        state_manager.mark_notifications_seen_by_proxy(notification_ids)
     return task_updates
 
 
@@ -351,72 +420,92 @@ async def handle_check_messages(request: web.Request) -> web.Response:
     count_param = request.query.get("count")
     count = min(int(count_param), MAX_MESSAGE_LIMIT) if count_param else None
 
-    channel_name = get_channel_name(channel_id)
     messages: list[dict] = []
     task_updates: list[dict] = []
 
-    # --- Messages ---
+    # DB reads/writes and the attachment directory scans run on the state
+    # manager's DB thread, in order, so the event loop is never blocked.
     try:
-        if count is not None:
-            since_id = None
-            limit = count
-        else:
-            since_id = None if all_messages else state_manager.get_last_seen(channel_id)
-
-        rows = state_manager.fetch_messages(
-            channel_id, since_id=since_id, limit=limit,
-        )
-        messages = [
-            state_manager._row_to_message_dict(
-                r,
-                attachment_paths=find_attachments_for_message(r["message_id"], channel_name),
-            )
-            for r in rows
-        ]
-
-        # Rows come back DESC; reverse to chronological order.
-        messages.reverse()
-
-        # Advance the watermark for real messages; clean up consumed synthetics.
-        synthetic_ids = [m["message_id"] for m in messages if m["message_id"] >= SYNTHETIC_ID_THRESHOLD]
-        real_messages = [m for m in messages if m["message_id"] < SYNTHETIC_ID_THRESHOLD]
-        if real_messages:
-            state_manager.update_last_seen(channel_id, max(m["message_id"] for m in real_messages))
-        _delete_synthetic_messages(synthetic_ids)
-
+        messages = await state_manager.run(_consume_messages, channel_id, limit, all_messages, count)
     except Exception as e:
         _LOG.error("Error reading messages: %s", e)
 
-    # --- Task updates ---
     try:
-        task_updates = _collect_task_updates()
+        task_updates = await state_manager.run(_collect_task_updates)
     except Exception as e:
         _LOG.error("Error reading notifications: %s", e)
 
     return web.json_response({"messages": messages, "task_updates": task_updates})
 
 
+def _consume_messages(channel_id: int, limit: int, all_messages: bool, count: int | None) -> list[dict]:
+    """Fetch messages for check_messages, advance the watermark, and drop consumed synthetics."""
+    channel_name = get_channel_name(channel_id)
+    if count is not None:
+        since_id = None
+        limit = count
+    else:
+        since_id = None if all_messages else state_manager.get_last_seen(channel_id)
+
+    rows = state_manager.fetch_messages(
+        channel_id, since_id=since_id, limit=limit,
+    )
+    attachments = find_attachments_for_messages((r["message_id"] for r in rows), channel_name)
+    messages = [
+        state_manager._row_to_message_dict(r, attachment_paths=attachments.get(r["message_id"], []))
+        for r in rows
+    ]
+
+    # Rows come back DESC; reverse to chronological order.
+    messages.reverse()
+
+    # Advance the watermark for real messages; clean up consumed synthetics.
+    # Both happen in one transaction.
+    synthetic_ids = [m["message_id"] for m in messages if m["message_id"] >= SYNTHETIC_ID_THRESHOLD]
+    real_ids = [m["message_id"] for m in messages if m["message_id"] < SYNTHETIC_ID_THRESHOLD]
+    state_manager.consume_messages(channel_id, max(real_ids) if real_ids else None, synthetic_ids)
+    return messages
+
+
+EMOJI_CACHE_FILE = SHARED_DIR / "emojis.json"
+
+# (mtime_ns, raw file bytes, parsed list) for EMOJI_CACHE_FILE, reloaded only
+# when the bot rewrites the file.
+_emoji_cache: tuple[int, bytes, list[dict]] | None = None
+
+
+def _load_emojis() -> tuple[bytes, list[dict]] | None:
+    """Return the emoji cache file's raw JSON and parsed list, or None if unavailable."""
+    global _emoji_cache
+    try:
+        mtime_ns = EMOJI_CACHE_FILE.stat().st_mtime_ns
+        if _emoji_cache is None or _emoji_cache[0] != mtime_ns:
+            raw = EMOJI_CACHE_FILE.read_bytes()
+            _emoji_cache = (mtime_ns, raw, json.loads(raw))
+    except (json.JSONDecodeError, OSError):
+        _emoji_cache = None
+        return None
+    return _emoji_cache[1], _emoji_cache[2]
+
+
 async def handle_emojis(request: web.Request) -> web.Response:
     """GET /api/emojis -- list custom server emojis.
 
     Query parameters:
         search -- case-insensitive substring filter on emoji name
     """
-    emoji_cache = SHARED_DIR / "emojis.json"
-    if not emoji_cache.exists():
-        return web.json_response({"custom": []})
-
-    try:
-        emojis = json.loads(emoji_cache.read_text())
-    except (json.JSONDecodeError, OSError):
+    loaded = _load_emojis()
+    if loaded is None:
         return web.json_response({"custom": []})
+    raw, emojis = loaded
 
     search = request.query.get("search")
-    if search:
-        term = search.lower()
-        emojis = [e for e in emojis if term in e.get("name", "").lower()]
+    if not search:
+        # The file already holds the JSON list; wrap it without re-encoding.
+        return web.Response(body=b'{"custom": ' + raw + b"}", content_type="application/json")
 
-    return web.json_response({"custom": emojis})
+    term = search.lower()
+    return web.json_response({"custom": [e for e in emojis if term in e.get("name", "").lower()]})
 
 
 # ---------------------------------------------------------------------------
@@ -473,16 +562,16 @@ async def _proxy_deploy(
         form.add_field("name", name)
         form.add_field("files", file_content, filename=archive_filename, content_type="application/gzip")
 
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
-            async with session.post(
-                f"{WENDY_WEB_URL}{deploy_path}",
-                data=form,
-                headers={"Authorization": f"Bearer {token}"},
-            ) as resp:
-                if resp.status != 200:
-                    detail = await resp.text()
-                    return web.json_response({"error": f"Deploy failed: {detail}"}, status=resp.status)
-                result = await resp.json()
+        async with _get_client_session().post(
+            f"{WENDY_WEB_URL}{deploy_path}",
+            data=form,
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as resp:
+            if resp.status != 200:
+                detail = await resp.text()
+                return web.json_response({"error": f"Deploy failed: {detail}"}, status=resp.status)
+            result = await resp.json()
 
         body: dict = {
             "success": True,
@@ -542,17 +631,17 @@ async def handle_game_logs(request: web.Request) -> web.Response:
     lines = int(request.query.get("lines", "100"))
 
     try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
-            async with session.get(
-                f"{WENDY_WEB_URL}/api/games/{name}/logs",
-                params={"lines": lines},
-                headers={"Authorization": f"Bearer {WENDY_GAMES_TOKEN}"},
-            ) as resp:
-                if resp.status == 404:
-                    return web.json_response({"name": name, "logs": f"Game '{name}' not found"})
-                if resp.status != 200:
-                    return web.json_response({"name": name, "logs": f"Error: {await resp.text()}"})
-                return web.json_response(await resp.json())
+        async with _get_client_session().get(
+            f"{WENDY_WEB_URL}/api/games/{name}/logs",
+            params={"lines": lines},
+            headers={"Authorization": f"Bearer {WENDY_GAMES_TOKEN}"},
+            timeout=aiohttp.ClientTimeout(total=30),
+        ) as resp:
+            if resp.status == 404:
+                return web.json_response({"name": name, "logs": f"Game '{name}' not found"})
+            if resp.status != 200:
+                return web.json_response({"name": name, "logs": f"Error: {await resp.text()}"})
+            return web.json_response(await resp.json())
     except aiohttp.ClientError as e:
         return web.json_response({"name": name, "logs": f"Connection error: {e}"})
 
@@ -730,14 +819,14 @@ async def handle_analyze_file(request: web.Request) -> web.Response:
         gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
         body = _build_gemini_request_body(file_content, media_type, prompt, duration)
 
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=300)) as session:
-            async with session.post(
-                gemini_url, headers={"x-goog-api-key": GEMINI_API_KEY}, json=body,
-            ) as resp:
-                if resp.status != 200:
-                    detail = await resp.text()
-                    return web.json_response({"error": f"Gemini API error: {detail}"}, status=502)
-                result = await resp.json()
+        async with _get_client_session().post(
+            gemini_url, headers={"x-goog-api-key": GEMINI_API_KEY}, json=body,
+            timeout=aiohttp.ClientTimeout(total=300),
+        ) as resp:
+            if resp.status != 200:
+                detail = await resp.text()
+                return web.json_response({"error": f"Gemini API error: {detail}"}, status=502)
+            result = await resp.json()
 
         try:
             analysis = result["candidates"][0]["content"]["parts"][0]["text"]
@@ -759,15 +848,19 @@ async def handle_analyze_file(request: web.Request) -> web.Response:
 # ---------------------------------------------------------------------------
 
 USAGE_DATA_FILE = WENDY_BASE / "usage_data.json"
-USAGE_FORCE_CHECK_FILE = WENDY_BASE / "usage_force_check"
 
 
 async def handle_usage(request: web.Request) -> web.Response:
     """GET /api/usage -- return Claude Code usage stats from the cached JSON file."""
-    if not USAGE_DATA_FILE.exists():
+    try:
+        raw = await asyncio.to_thread(USAGE_DATA_FILE.read_bytes)
+    except FileNotFoundError:
         return web.json_response({"error": "Usage data not available yet"}, status=404)
+    except OSError as e:
+        _LOG.error("usage error: %s", e)
+        return web.json_response({"error": "Failed to read usage data"}, status=500)
     try:
-        data = json.loads(USAGE_DATA_FILE.read_text())
+        data = json.loads(raw)
         week_all = data.get("week_all_percent", 0)
         week_sonnet = data.get("week_sonnet_percent", 0)
         updated = data.get("updated_at", "unknown")
@@ -783,13 +876,12 @@ async def handle_usage(request: web.Request) -> web.Response:
 
 
 async def handle_usage_refresh(request: web.Request) -> web.Response:
-    """POST /api/usage/refresh -- create a marker file to trigger an immediate usage check."""
-    try:
-        USAGE_FORCE_CHECK_FILE.touch()
-        return web.json_response({"success": True, "message": "Usage refresh requested. Check back in ~30s."})
-    except Exception as e:
-        _LOG.error("usage refresh error: %s", e)
-        return web.json_response({"error": "Internal server error"}, status=500)
+    """POST /api/usage/refresh -- trigger a usage check on the task runner's next poll."""
+    if not _discord_bot or not hasattr(_discord_bot, "request_usage_refresh"):
+        return web.json_response({"error": "bot not available"}, status=503)
+    if not _discord_bot.request_usage_refresh():
+        return web.json_response({"error": "task runner not running"}, status=503)
+    return web.json_response({"success": True, "message": "Usage refresh requested. Check back in ~30s."})
 
 
 async def handle_health(request: web.Request) -> web.Response:
@@ -851,6 +943,7 @@ def create_app() -> web.Application:
     app.router.add_post("/api/usage/refresh", handle_usage_refresh)
     app.router.add_post("/api/schedule_wake", handle_schedule_wake)
     app.router.add_get("/health", handle_health)
+    app.on_cleanup.append(_close_client_session)
     return app
 
 
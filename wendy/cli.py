@@ -10,10 +10,11 @@ import asyncio
 import json
 import logging
 import os
+import re
 import shutil
 import time
 from pathlib import Path
-from typing import Any
+from typing import Any, TextIO
 
 from . import sessions
 from .config import (
@@ -34,11 +35,46 @@ from .paths import (
     current_session_file,
     ensure_channel_dirs,
     ensure_shared_dirs,
+    files_beyond_newest,
+    files_by_mtime,
     session_dir,
 )
 
 _LOG = logging.getLogger(__name__)
 
+# Block size for scanning the stream log backwards when trimming.
+_TRIM_CHUNK_SIZE = 64 * 1024
+
+# Pulls the human-readable message out of an API error JSON in a CLI debug log.
+_ERROR_MESSAGE_RE = re.compile(r'"message":\s*"([^"]+)"')
+
+# Append handle for STREAM_LOG_FILE, opened on first use and kept for the
+# life of the process. trim_stream_log truncates in place, which O_APPEND
+# writes follow, so the handle stays valid across trims.
+_stream_log_fh: TextIO | None = None
+
+# Events are queued here and written in one call shortly after the first one
+# arrives, so a burst of CLI output costs one write instead of one per line.
+# Whole lines only ever reach the file, which the dashboard tailer relies on.
+_STREAM_LOG_FLUSH_DELAY = 0.2
+_stream_log_pending: list[str] = []
+_stream_log_flush_scheduled = False
+
+# Lines appended since the last trim (None until the first trim this process).
+# trim_stream_log only rewrites the file once this passes a tenth of the cap,
+# so the log floats between MAX_STREAM_LOG_LINES and ~1.1x that instead of
+# being rewritten after every CLI run.
+_stream_log_appended: int | None = None
+
+_DEBUG_LOG_DIR = Path("/data/wendy/debug_logs")
+
+# Directories and channel folders already set up by this process. Everything
+# they cover lives on the data volume or comes from the image, so it only
+# needs doing once rather than before every CLI run.
+_shared_setup_done = False
+_prepared_channels: set[tuple[str, bool]] = set()
+_debug_dir_ready = False
+
 TOOL_INSTRUCTIONS_TEMPLATE = """
 ---
 REAL-TIME CHANNEL TOOLS (Channel ID: {channel_id})
@@ -277,6 +313,7 @@ def setup_channel_folder(channel_name: str, beads_enabled: bool = False) -> None
     if claude_settings_src.exists():
         if not settings_dest.exists() or settings_dest.stat().st_mtime < claude_settings_src.stat().st_mtime:
             shutil.copy2(claude_settings_src, settings_dest)
+    _prepared_channels.add((channel_name, beads_enabled))
 
 
 def _sync_scripts(src_dir: Path, dest_dir: Path, pattern: str, *, make_executable: bool = False) -> None:
@@ -291,6 +328,7 @@ def _sync_scripts(src_dir: Path, dest_dir: Path, pattern: str, *, make_executabl
 
 def setup_wendy_scripts() -> None:
     """Sync helper scripts to the data volume and ensure shared dirs exist."""
+    global _shared_setup_done
     scripts_src = Path("/app/scripts")
     if scripts_src.exists():
         _sync_scripts(scripts_src, WENDY_BASE, "*.sh", make_executable=True)
@@ -305,42 +343,140 @@ def setup_wendy_scripts() -> None:
 
     secrets_dir = WENDY_BASE / "secrets"
     secrets_dir.mkdir(exist_ok=True, mode=0o700)
+    _shared_setup_done = True
 
 
-def append_to_stream_log(event: dict, channel_id: int | None) -> None:
-    """Append a single event to the rolling stream log file."""
-    try:
+def _stream_log_handle() -> TextIO:
+    """Return the shared line-buffered append handle for the stream log."""
+    global _stream_log_fh
+    if _stream_log_fh is None or _stream_log_fh.closed or _stream_log_fh.name != str(STREAM_LOG_FILE):
+        if _stream_log_fh is not None:
+            _stream_log_fh.close()
         STREAM_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-        enriched = {
-            "ts": int(time.time() * 1000),
-            "channel_id": str(channel_id) if channel_id else None,
-            "event": event,
-        }
-        with open(STREAM_LOG_FILE, "a") as f:
-            f.write(json.dumps(enriched) + "\n")
+        _stream_log_fh = open(STREAM_LOG_FILE, "a", buffering=1, encoding="utf-8")
+    return _stream_log_fh
+
+
+def _close_stream_log() -> None:
+    """Drop the cached stream log handle so the next append reopens the file."""
+    global _stream_log_fh
+    if _stream_log_fh is not None:
+        _stream_log_fh.close()
+        _stream_log_fh = None
+
+
+def append_to_stream_log(event: dict, channel_id: int | None, raw: str | None = None) -> None:
+    """Append a single event to the rolling stream log file.
+
+    When *raw* (the event's original JSON text) is given it is spliced into
+    the envelope as-is instead of re-encoding *event*, which matters for
+    large tool-result payloads. Otherwise non-ASCII text is written as UTF-8
+    rather than ``\\uXXXX``-escaped, which is cheaper to encode and smaller
+    on disk.
+    """
+    global _stream_log_flush_scheduled
+    try:
+        ts = int(time.time() * 1000)
+        channel = str(channel_id) if channel_id else None
+        if raw is not None:
+            line = f'{{"ts": {ts}, "channel_id": {json.dumps(channel)}, "event": {raw}}}'
+        else:
+            line = json.dumps({"ts": ts, "channel_id": channel, "event": event}, ensure_ascii=False)
+    except Exception as e:
+        _LOG.error("Failed to append to stream log: %s", e)
+        return
+    _stream_log_pending.append(line + "\n")
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        flush_stream_log()
+        return
+    if not _stream_log_flush_scheduled:
+        _stream_log_flush_scheduled = True
+        loop.call_later(_STREAM_LOG_FLUSH_DELAY, flush_stream_log)
+
+
+def flush_stream_log() -> None:
+    """Write any queued stream log lines to disk in a single call."""
+    global _stream_log_flush_scheduled, _stream_log_appended
+    _stream_log_flush_scheduled = False
+    if not _stream_log_pending:
+        return
+    data = "".join(_stream_log_pending)
+    count = len(_stream_log_pending)
+    _stream_log_pending.clear()
+    try:
+        _stream_log_handle().write(data)
+        if _stream_log_appended is not None:
+            _stream_log_appended += count
     except Exception as e:
+        _close_stream_log()
         _LOG.error("Failed to append to stream log: %s", e)
 
 
 def trim_stream_log() -> None:
-    """Trim stream log to MAX_STREAM_LOG_LINES."""
+    """Trim stream log to MAX_STREAM_LOG_LINES once enough new lines have accumulated."""
+    global _stream_log_appended
+    flush_stream_log()
+    if _stream_log_appended is not None and _stream_log_appended < max(1, MAX_STREAM_LOG_LINES // 10):
+        return
     try:
         if not STREAM_LOG_FILE.exists():
+            # Removed out from under us; stop writing to the unlinked inode.
+            _close_stream_log()
             return
-        with open(STREAM_LOG_FILE) as f:
-            lines = f.readlines()
-        if len(lines) > MAX_STREAM_LOG_LINES:
-            with open(STREAM_LOG_FILE, "w") as f:
-                f.writelines(lines[-MAX_STREAM_LOG_LINES:])
+        _trim_to_last_lines(STREAM_LOG_FILE, MAX_STREAM_LOG_LINES)
+        _stream_log_appended = 0
     except Exception as e:
         _LOG.error("Failed to trim stream log: %s", e)
 
 
+def _trim_to_last_lines(path: Path, max_lines: int) -> None:
+    """Keep only the last *max_lines* newline-terminated lines of *path*.
+
+    Scans backwards from the end in fixed-size blocks, only counting
+    newlines, to find the cut offset; the retained tail is then read once
+    and written back. Leaves the file untouched when it is already short
+    enough.
+    """
+    with open(path, "r+b") as f:
+        pos = f.seek(0, os.SEEK_END)
+        # The cut point is just after the (max_lines + 1)-th newline from the end.
+        needed = max_lines + 1
+        cut = None
+        while pos > 0:
+            read_size = min(_TRIM_CHUNK_SIZE, pos)
+            pos -= read_size
+            f.seek(pos)
+            chunk = f.read(read_size)
+            count = chunk.count(b"\n")
+            if count < needed:
+                needed -= count
+                continue
+            end = len(chunk)
+            for _ in range(needed):
+                end = chunk.rindex(b"\n", 0, end)
+            cut = pos + end + 1
+            break
+        if cut is None:
+            return
+
+        f.seek(cut)
+        tail = f.read()
+        f.seek(0)
+        f.write(tail)
+        f.truncate()
+
+
 def save_debug_log(events: list[dict], channel_id: int | None) -> None:
     """Save CLI events to debug log file (keeps last 20)."""
+    global _debug_dir_ready
     try:
-        debug_dir = Path("/data/wendy/debug_logs")
-        debug_dir.mkdir(parents=True, exist_ok=True)
+        debug_dir = _DEBUG_LOG_DIR
+        if not _debug_dir_ready:
+            debug_dir.mkdir(parents=True, exist_ok=True)
+            _debug_dir_ready = True
 
         timestamp = int(time.time() * 1000)
         channel_str = str(channel_id) if channel_id else "unknown"
@@ -350,12 +486,12 @@ def save_debug_log(events: list[dict], channel_id: int | None) -> None:
             "timestamp": timestamp,
             "channel_id": channel_id,
             "events": events,
-        }, indent=2))
+        }, ensure_ascii=False), encoding="utf-8")
 
-        logs = sorted(debug_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
-        for old_log in logs[:-20]:
-            old_log.unlink()
+        for old_log in files_beyond_newest(debug_dir, 20, suffix=".json"):
+            os.unlink(old_log)
     except Exception as e:
+        _debug_dir_ready = False  # re-check the directory next time
         _LOG.error("Failed to save debug log: %s", e)
 
 
@@ -370,17 +506,16 @@ def get_recent_cli_error() -> str | None:
     if not debug_dir.exists():
         return None
     try:
-        debug_files = sorted(debug_dir.glob("*.txt"), key=lambda p: p.stat().st_mtime, reverse=True)
+        debug_files = files_by_mtime(debug_dir, suffix=".txt")
         if not debug_files:
             return None
 
-        content = debug_files[0].read_text(errors="replace")
+        content = Path(debug_files[-1][1]).read_text(errors="replace")
 
         if "OAuth token has expired" in content:
             return "OAuth token has expired"
         if "authentication_error" in content:
-            import re
-            match = re.search(r'"message":\s*"([^"]+)"', content)
+            match = _ERROR_MESSAGE_RE.search(content)
             return match.group(1) if match else "authentication error"
 
         for line in reversed(content.strip().split("\n")[-20:]):
@@ -540,33 +675,43 @@ async def _watch_session_for_overloaded(
     the tail of the session file every *poll_interval* seconds.  When it
     spots ``overloaded_error``, it kills the subprocess so the caller
     can retry with a different model.
+
+    The file is opened once and kept open, so each tick is a single read of
+    whatever was appended instead of a stat + open + seek + read + close.
     """
-    # Record the file size at start so we only scan new bytes.
+    marker = b"overloaded_error"
+    tail = b""  # end of the previous read, in case the marker straddles two reads
+    f = None
     try:
-        initial_size = session_jsonl.stat().st_size
-    except OSError:
-        initial_size = 0
-
-    while proc.returncode is None:
-        await asyncio.sleep(poll_interval)
-        try:
-            current_size = session_jsonl.stat().st_size
-        except OSError:
-            continue
-        if current_size <= initial_size:
-            continue
-        # Read only the new tail.
+        # Only scan bytes written after we start; a session file that doesn't
+        # exist yet is read from the beginning once it appears.
         try:
-            with open(session_jsonl, "r", encoding="utf-8", errors="replace") as f:
-                f.seek(initial_size)
-                new_data = f.read()
+            f = open(session_jsonl, "rb")
+            f.seek(0, os.SEEK_END)
         except OSError:
-            continue
-        initial_size = current_size
-        if "overloaded_error" in new_data:
-            _LOG.warning("Session JSONL contains overloaded_error, killing CLI")
-            _kill_process(proc)
-            return
+            f = None
+
+        while proc.returncode is None:
+            await asyncio.sleep(poll_interval)
+            if f is None:
+                try:
+                    f = open(session_jsonl, "rb")
+                except OSError:
+                    continue
+            try:
+                chunk = f.read()
+            except OSError:
+                continue
+            if not chunk:
+                continue
+            if marker in tail + chunk:
+                _LOG.warning("Session JSONL contains overloaded_error, killing CLI")
+                _kill_process(proc)
+                return
+            tail = chunk[-(len(marker) - 1):]
+    finally:
+        if f is not None:
+            f.close()
 
 
 async def _stream_cli_output(
@@ -632,7 +777,7 @@ async def _stream_cli_output(
             try:
                 event = json.loads(decoded)
                 events.append(event)
-                append_to_stream_log(event, channel_id)
+                append_to_stream_log(event, channel_id, raw=decoded)
                 if event.get("type") == "result":
                     usage = event.get("usage", {})
                 # Also check stdout in case the CLI does emit it here.
@@ -744,10 +889,12 @@ async def run_cli(
         was_compacted=was_compacted,
     )
 
-    # Ensure filesystem prerequisites.
-    WENDY_BASE.mkdir(parents=True, exist_ok=True)
-    setup_wendy_scripts()
-    setup_channel_folder(channel_name, beads_enabled=beads_enabled)
+    # Ensure filesystem prerequisites (once per process / channel).
+    if not _shared_setup_done:
+        WENDY_BASE.mkdir(parents=True, exist_ok=True)
+        setup_wendy_scripts()
+    if (channel_name, beads_enabled) not in _prepared_channels:
+        setup_channel_folder(channel_name, beads_enabled=beads_enabled)
 
     session_action = "starting new" if is_new_session else "resuming"
     _LOG.info("CLI: %s session %s for channel %d (model=%s)", session_action, session_id[:8], channel_id, effective_model)
@@ -93,14 +93,29 @@ def _validate_name(name: str) -> bool:
     return bool(name and CHANNEL_NAME_PATTERN.match(name))
 
 
+_channel_config_cache: tuple[str, dict[int, dict]] | None = None
+"""Last (raw env value, parsed configs) pair, reused while the env var is unchanged."""
+
+
 def parse_channel_configs() -> dict[int, dict]:
     """Parse WENDY_CHANNEL_CONFIG env var into a dict of channel_id -> config.
 
     Returns raw dicts (not ChannelConfig dataclasses) for compatibility with
-    the CLI and other modules that pass config dicts around.
+    the CLI and other modules that pass config dicts around. The JSON is only
+    re-parsed when the env value changes; each call gets its own copies of
+    the per-channel dicts so callers can add keys freely.
     """
-    configs: dict[int, dict] = {}
+    global _channel_config_cache
+
     config_json = os.getenv("WENDY_CHANNEL_CONFIG", "")
+    if _channel_config_cache is None or _channel_config_cache[0] != config_json:
+        _channel_config_cache = (config_json, _parse_channel_config_json(config_json))
+    return {channel_id: dict(cfg) for channel_id, cfg in _channel_config_cache[1].items()}
+
+
+def _parse_channel_config_json(config_json: str) -> dict[int, dict]:
+    """Validate and normalise the raw WENDY_CHANNEL_CONFIG JSON."""
+    configs: dict[int, dict] = {}
     if not config_json:
         return configs
 
@@ -137,7 +152,7 @@ def parse_channel_configs() -> dict[int, dict]:
             "beads_enabled": cfg.get("beads_enabled", False),
             "enrichment_enabled": cfg.get("enrichment_enabled", False),
             "_folder": folder,
-            "ignore_user_ids": set(int(uid) for uid in cfg.get("ignore_user_ids", [])),
+            "ignore_user_ids": frozenset(int(uid) for uid in cfg.get("ignore_user_ids", [])),
         }
 
     _LOG.info("Loaded %d channel configs", len(configs))
@@ -8,19 +8,24 @@ from __future__ import annotations
 
 import asyncio
 import datetime
+import functools
 import io
 import json
 import logging
+import random
+import re
 import shutil
 import subprocess
 import time
+from dataclasses import dataclass
 from pathlib import Path
 
+import aiohttp
 import discord
 from discord.ext import commands, tasks
 
 from . import api_server, sessions
-from .cli import ClaudeCliError, run_cli, setup_wendy_scripts
+from .cli import ClaudeCliError, flush_stream_log, run_cli, setup_wendy_scripts
 from .config import (
     ENRICHMENT_DURATION,
     ENRICHMENT_HOUR_UTC,
@@ -37,6 +42,7 @@ from .paths import (
     ensure_channel_dirs,
     ensure_shared_dirs,
     session_dir,
+    write_text_atomic,
 )
 from .state import state as state_manager
 from .tasks import TaskRunner
@@ -52,12 +58,69 @@ _cached_usage: dict = {}
 # Minimum seconds between presence updates (15 minutes).
 _PRESENCE_INTERVAL = 900
 
+# Messages starting with one of these are bot commands, never forwarded to the CLI.
+_COMMAND_PREFIXES = ("!", "-", "/")
+
+# Fallback poll interval for notifications written by other processes (the web
+# service's webhooks). In-process task completions wake the watcher immediately.
+_NOTIFICATION_POLL_INTERVAL = 5.0
+
+# After an in-process wake, wait this long before draining so completions that
+# land together go out as one batch and wake each channel once.
+_NOTIFICATION_COALESCE_WINDOW = 0.5
+
+# Minutes between explicit WAL checkpoints, keeping checkpoint work off the
+# commit path of message writes.
+_WAL_CHECKPOINT_MINUTES = 5
+
+# Notifications kept by the periodic prune in the DB maintenance loop.
+_NOTIFICATION_KEEP_COUNT = 100
+
+# Read size for streaming attachment downloads to disk.
+_ATTACHMENT_CHUNK_SIZE = 64 * 1024
+
+# Downloaded bytes buffered in memory before one disk write in a worker thread,
+# so each executor hop carries ~1 MiB instead of a single network chunk.
+_ATTACHMENT_FLUSH_SIZE = 1024 * 1024
+
+# Attempts per attachment URL when the CDN answers 429 or 5xx, and the cap on
+# the backoff between them.
+_ATTACHMENT_FETCH_ATTEMPTS = 3
+_ATTACHMENT_MAX_BACKOFF = 30.0
+
+# Matches CLI errors reporting an expired OAuth token (case-insensitive, same line).
+_OAUTH_EXPIRED_RE = re.compile(r"oauth[^\n]*expired", re.IGNORECASE)
+
 
 def _folder_for_config(config: dict) -> str:
     """Return the workspace folder name for a channel or thread config."""
     return config.get("_folder") or config.get("name", "default")
 
 
+def _synthetic_message_row(
+    channel_id: int,
+    author: str,
+    content: str,
+    guild_id: int | None = None,
+) -> tuple:
+    """Build a ``message_history`` row for a synthetic (bot-injected) message.
+
+    IDs start at 9e18 to stay out of the way of real Discord snowflakes.
+    """
+    global _synthetic_counter
+    _synthetic_counter += 1
+    synthetic_id = 9_000_000_000_000_000_000 + int(time.time_ns() // 1000) + _synthetic_counter
+    return (synthetic_id, channel_id, guild_id, 0, author, 0, 0, content, int(time.time()), None, None)
+
+
+async def _wait_for_file(path: Path, attempts: int = 3, delay: float = 0.1) -> None:
+    """Give a just-written file a few short chances to appear (network mount flush delays)."""
+    for _ in range(attempts):
+        if path.exists():
+            return
+        await asyncio.sleep(delay)
+
+
 def _get_current_effort(model: str) -> list[str]:
     """Return ``["--effort", "low"]`` for Opus when weekly usage >= 85%, else ``[]``.
 
@@ -72,6 +135,27 @@ def _get_current_effort(model: str) -> list[str]:
     return []
 
 
+def _retry_delay(error: aiohttp.ClientResponseError, attempt: int) -> float:
+    """Seconds to wait before retry *attempt*: ``Retry-After`` if given, else jittered exponential backoff."""
+    retry_after = (error.headers or {}).get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), _ATTACHMENT_MAX_BACKOFF)
+        except ValueError:
+            pass
+    return min(2 ** attempt + random.random(), _ATTACHMENT_MAX_BACKOFF)
+
+
+@functools.lru_cache(maxsize=16)
+def _parse_reset_time(iso: str) -> datetime.datetime:
+    """Parse a usage reset timestamp (``Z`` suffix allowed).
+
+    The same reset time comes back on every hourly usage check for a week,
+    so the parse is memoised by the raw string.
+    """
+    return datetime.datetime.fromisoformat(iso.replace("Z", "+00:00"))
+
+
 _MAX_TIMEOUT_CONTINUATIONS = 2
 """Max times a timed-out generation will auto-continue before giving up."""
 
@@ -79,20 +163,20 @@ _MAX_ENRICHMENT_CONTINUATIONS = 10
 """Max times an enrichment session will re-invoke before giving up."""
 
 
+@dataclass(slots=True, eq=False)
 class GenerationJob:
     """Tracks an active Claude CLI generation for a channel."""
 
-    def __init__(self) -> None:
-        self.task: asyncio.Task | None = None
-        self.new_message_pending: bool = False
-        self.is_enrichment: bool = False
-        self.enrichment_end_time: str = ""
-        self.enrichment_end_timestamp: float = 0.0
-        self.enrichment_continuation: bool = False
-        self.enrichment_continuation_count: int = 0
-        self.timed_out: bool = False
-        self.continuation_count: int = 0
-        self.overload_retried: bool = False
+    task: asyncio.Task | None = None
+    new_message_pending: bool = False
+    is_enrichment: bool = False
+    enrichment_end_time: str = ""
+    enrichment_end_timestamp: float = 0.0
+    enrichment_continuation: bool = False
+    enrichment_continuation_count: int = 0
+    timed_out: bool = False
+    continuation_count: int = 0
+    overload_retried: bool = False
 
 
 class WendyBot(commands.Bot):
@@ -111,14 +195,31 @@ class WendyBot(commands.Bot):
         super().__init__(command_prefix="!", intents=intents)
 
         self.channel_configs: dict[int, dict] = parse_channel_configs()
-        self.whitelist_channels: set[int] = set(self.channel_configs.keys())
+        self.whitelist_channels: frozenset[int] = frozenset(self.channel_configs)
+        # Thread configs added later inherit their parent's mode and sort after
+        # it, so the first full-mode channel is always a top-level one.
+        self._fallback_notification_channel: int | None = next(
+            (cid for cid, cfg in self.channel_configs.items() if cfg.get("mode") == "full"),
+            next(iter(self.whitelist_channels), None),
+        )
         self._active_generations: dict[int, GenerationJob] = {}
         self._api_runner = None
+        self._bot_user_id: int = 0
+        self._http_session: aiohttp.ClientSession | None = None
         self._presence_updated_at: float = 0.0
+        self._usage_file_mtime_ns: int = 0
+        self._usage_file_data: dict | None = None
         self._enrichment_last_run_date: dict[int, datetime.date] = {}
         self._enrichment_notified: set[int] = set()
         self._pending_wakes: dict[int, asyncio.TimerHandle] = {}
+        self._notification_event = asyncio.Event()
+        self._wake_queue: asyncio.Queue[int] = asyncio.Queue()
         self._startup_catchup_done: bool = False
+        self._att_dirs_ready: set[str] = set()
+        self._pending_message_rows: list[tuple] = []
+        self._message_flush: asyncio.Future | None = None
+        self._emoji_cache_json: str | None = None
+        self._version_str: str | None = None
 
         ensure_shared_dirs()
         self._register_commands()
@@ -135,18 +236,23 @@ class WendyBot(commands.Bot):
         @self.command(name="version")
         async def cmd_version(ctx: commands.Context) -> None:
             """!version -- show the running git commit."""
-            try:
-                sha = subprocess.check_output(
-                    ["git", "rev-parse", "--short", "HEAD"],
-                    cwd="/app", stderr=subprocess.DEVNULL,
-                ).decode().strip()
-                msg = subprocess.check_output(
-                    ["git", "log", "-1", "--format=%s"],
-                    cwd="/app", stderr=subprocess.DEVNULL,
-                ).decode().strip()
-                await ctx.send(f"`{sha}` {msg}")
-            except Exception:
-                await ctx.send("version unknown")
+            if self._version_str is None:
+                try:
+                    # One git call for both fields, run off the event loop. The
+                    # result is cached: the running code can't change under us.
+                    proc = await asyncio.create_subprocess_exec(
+                        "git", "log", "-1", "--format=%h%x00%s",
+                        cwd="/app", stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                    )
+                    stdout, _ = await proc.communicate()
+                    if proc.returncode != 0:
+                        raise RuntimeError(f"git exited with {proc.returncode}")
+                    sha, _, msg = stdout.decode().strip().partition("\0")
+                    self._version_str = f"`{sha}` {msg}"
+                except Exception:
+                    await ctx.send("version unknown")
+                    return
+            await ctx.send(self._version_str)
 
         @self.command(name="system")
         async def cmd_system(ctx: commands.Context) -> None:
@@ -208,19 +314,19 @@ class WendyBot(commands.Bot):
             if channel_config is None:
                 await ctx.send("not a configured channel")
                 return
-            existing_job = self._active_generations.get(ctx.channel.id)
-            if self._job_is_running(existing_job) and existing_job.is_enrichment:
-                await ctx.send("already on lunch break!")
-                return
-            if self._job_is_running(existing_job):
+            existing_job = self._running_job(ctx.channel.id)
+            if existing_job is not None:
+                if existing_job.is_enrichment:
+                    await ctx.send("already on lunch break!")
+                    return
                 existing_job.task.cancel()
             self._start_enrichment(ctx.channel, channel_config, manual=True)
 
         @self.command(name="endlunch")
         async def cmd_endlunch(ctx: commands.Context) -> None:
             """!endlunch -- end Wendy's lunch break early."""
-            existing_job = self._active_generations.get(ctx.channel.id)
-            if not (self._job_is_running(existing_job) and existing_job.is_enrichment):
+            existing_job = self._running_job(ctx.channel.id)
+            if existing_job is None or not existing_job.is_enrichment:
                 await ctx.send("no lunch break active")
                 return
             # Set end timestamp to past so _finalize_generation doesn't re-invoke.
@@ -267,38 +373,50 @@ class WendyBot(commands.Bot):
         api_server.set_discord_bot(self)
         api_server.set_channel_configs(self.channel_configs)
         self._api_runner = await api_server.start_server(int(PROXY_PORT))
+        self._http_session = aiohttp.ClientSession()
 
         if self.whitelist_channels:
             self.watch_notifications.start()
             self.check_enrichment_schedule.start()
+        self.checkpoint_wal.start()
 
         self._cache_emojis_task = self.loop.create_task(self._cache_emojis())
-        self._task_runner = TaskRunner()
+        self._wake_worker_task = self.loop.create_task(self._wake_worker())
+        self._task_runner = TaskRunner(on_notification=self._notification_event.set)
         self._task_runner_task = self.loop.create_task(self._task_runner.run())
 
     async def close(self) -> None:
         """Cleanup on shutdown: cancel the task runner so agents are killed cleanly."""
+        if hasattr(self, "_wake_worker_task"):
+            self._wake_worker_task.cancel()
         if hasattr(self, "_task_runner_task") and not self._task_runner_task.done():
             self._task_runner_task.cancel()
             try:
                 await self._task_runner_task
             except asyncio.CancelledError:
                 pass
+        self.checkpoint_wal.cancel()
         if self._api_runner:
             await self._api_runner.cleanup()
+        if self._http_session:
+            await self._http_session.close()
         await super().close()
+        flush_stream_log()
+        state_manager.close()
 
     async def on_ready(self) -> None:
         """Publish bot ID and ensure workspace directories for every channel."""
         _LOG.info("Logged in as %s (id=%d)", self.user.name, self.user.id)
         from . import config as _config
         _config.WENDY_BOT_ID = self.user.id
+        self._bot_user_id = self.user.id
 
         from .cli import setup_channel_folder
         for cfg in self.channel_configs.values():
             folder = _folder_for_config(cfg)
             beads = cfg.get("beads_enabled", False)
             ensure_channel_dirs(folder, beads_enabled=beads)
+            self._att_dirs_ready.add(folder)
             setup_channel_folder(folder, beads_enabled=beads)
 
         # Catch up on messages that arrived (or were mid-generation) while the
@@ -314,7 +432,7 @@ class WendyBot(commands.Bot):
         """Start a generation for each whitelisted channel with unread user messages."""
         for channel_id in self.whitelist_channels:
             try:
-                unread = api_server.check_for_new_messages(channel_id)
+                unread = await state_manager.run(api_server.check_for_new_messages, channel_id)
             except Exception as e:
                 _LOG.warning("startup catchup: check failed for %s: %s", channel_id, e)
                 continue
@@ -335,65 +453,70 @@ class WendyBot(commands.Bot):
 
     async def on_message(self, message: discord.Message) -> None:
         """Route an incoming Discord message to caching, commands, or CLI generation."""
-        if message.author.id == self.user.id or not message.guild:
+        if message.author.id == self._bot_user_id or not message.guild:
             return
 
         # Guild-wide message logging (before any whitelist filtering).
-        if MESSAGE_LOGGER_GUILDS and message.guild.id in MESSAGE_LOGGER_GUILDS:
-            self._cache_message(message)
+        in_logger_guild = bool(MESSAGE_LOGGER_GUILDS) and message.guild.id in MESSAGE_LOGGER_GUILDS
+        if in_logger_guild:
+            await self._cache_message(message)
 
         if not self._channel_allowed(message):
             return
 
-        self._ensure_thread_config(message)
+        # Cheap content checks first: empty messages never need a thread
+        # config, a DB write, or attachment downloads.
+        content = message.content
+        is_command = content.startswith(_COMMAND_PREFIXES)
+        if not is_command and (not content or content.isspace()) and not message.attachments:
+            return
 
-        channel_config = self.channel_configs.get(message.channel.id, {})
-        channel_name = _folder_for_config(channel_config)
+        self._ensure_thread_config(message)
 
         # Bot commands (!, -, /) are dispatched and not forwarded to CLI.
-        if message.content.startswith(("!", "-", "/")):
+        if is_command:
             await self.process_commands(message)
             return
 
-        if not message.content.strip() and not message.attachments:
-            return
+        channel_config = self.channel_configs.get(message.channel.id, {})
+        channel_name = _folder_for_config(channel_config)
 
         # Cache to SQLite if not already logged by guild-wide logging above.
-        if not MESSAGE_LOGGER_GUILDS or message.guild.id not in MESSAGE_LOGGER_GUILDS:
-            self._cache_message(message)
+        if not in_logger_guild:
+            await self._cache_message(message)
 
         await self._save_attachments(message, channel_name)
 
         # Ignored users: message is stored but does not wake the bot.
-        if message.author.id in channel_config.get("ignore_user_ids", set()):
+        if message.author.id in channel_config.get("ignore_user_ids", ()):
             return
 
-        _LOG.info("Processing message from %s: %s...", message.author.display_name, message.content[:50])
+        _LOG.info("Processing message from %s: %s...", message.author.display_name, content[:50])
+
+        existing_job = self._running_job(message.channel.id)
+        if existing_job is None:
+            self._start_generation(message.channel, channel_config)
+            return
 
         # Interrupt: "WENDY" in all caps cancels the running generation.
-        existing_job = self._active_generations.get(message.channel.id)
-        if message.content.strip() == "WENDY" and self._job_is_running(existing_job):
+        if content.strip() == "WENDY":
             self._interrupt_channel(message, existing_job, channel_config)
             return
 
-        # If a generation is already running: enrich sessions suppress new messages,
+        # A generation is already running: enrich sessions suppress new messages,
         # normal sessions flag pending so a follow-up runs when the CLI finishes.
-        if self._job_is_running(existing_job):
-            if existing_job.is_enrichment:
-                if message.channel.id not in self._enrichment_notified:
-                    self._enrichment_notified.add(message.channel.id)
-                    end_time = existing_job.enrichment_end_time
-                    asyncio.ensure_future(
-                        message.channel.send(
-                            f"<@{message.author.id}> Wendy's on her lunch break until {end_time} UTC! She'll be back soon."
-                        )
+        if existing_job.is_enrichment:
+            if message.channel.id not in self._enrichment_notified:
+                self._enrichment_notified.add(message.channel.id)
+                end_time = existing_job.enrichment_end_time
+                asyncio.ensure_future(
+                    message.channel.send(
+                        f"<@{message.author.id}> Wendy's on her lunch break until {end_time} UTC! She'll be back soon."
                     )
-                return
-            existing_job.new_message_pending = True
-            _LOG.info("CLI already running in channel %s, marked pending", message.channel.id)
+                )
             return
-
-        self._start_generation(message.channel, channel_config)
+        existing_job.new_message_pending = True
+        _LOG.info("CLI already running in channel %s, marked pending", message.channel.id)
 
     async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
         """Propagate message edits to SQLite so check_messages sees fresh content."""
@@ -405,23 +528,33 @@ class WendyBot(commands.Bot):
         if "content" not in payload.data:
             return
         try:
-            state_manager.update_message_content(payload.message_id, payload.data["content"])
+            await state_manager.run(state_manager.update_message_content, payload.message_id, payload.data["content"])
         except Exception as e:
             _LOG.error("Failed to update edited message %s: %s", payload.message_id, e)
 
+    async def on_guild_emojis_update(
+        self,
+        guild: discord.Guild,
+        before: list[discord.Emoji],
+        after: list[discord.Emoji],
+    ) -> None:
+        """Keep the emoji cache file in step with emoji additions, removals and renames."""
+        await self._write_emoji_cache()
+
     # ------------------------------------------------------------------
     # Channel / thread helpers
     # ------------------------------------------------------------------
 
     def _channel_allowed(self, message: discord.Message) -> bool:
         """Return True if the message is from a whitelisted channel or mentions the bot."""
-        if self.user in message.mentions:
+        whitelist = self.whitelist_channels
+        if message.channel.id in whitelist:
             return True
-        if message.channel.id in self.whitelist_channels:
+        if isinstance(message.channel, discord.Thread) and message.channel.parent_id in whitelist:
             return True
-        if isinstance(message.channel, discord.Thread):
-            return message.channel.parent_id in self.whitelist_channels
-        return False
+        # Compare IDs rather than User objects; raw_mentions would miss reply pings.
+        bot_id = self._bot_user_id
+        return any(user.id == bot_id for user in message.mentions)
 
     def _ensure_thread_config(self, message: discord.Message) -> None:
         """Lazily create a channel config entry for new threads."""
@@ -444,8 +577,14 @@ class WendyBot(commands.Bot):
             content = content.replace(f"<@!{member.id}>", replacement)
         return content
 
-    def _cache_message(self, message: discord.Message) -> None:
-        """Persist a Discord message to SQLite for later retrieval by check_messages."""
+    async def _cache_message(self, message: discord.Message) -> None:
+        """Persist a Discord message to SQLite for later retrieval by check_messages.
+
+        Fields are read from the message on the event loop; the insert itself
+        runs on the state manager's DB thread so a slow commit can't stall
+        the gateway. Messages cached during the same loop iteration share one
+        transaction, and each caller returns only once its row is committed.
+        """
         attachment_urls = (
             json.dumps([a.url for a in message.attachments])
             if message.attachments else None
@@ -455,19 +594,29 @@ class WendyBot(commands.Bot):
             if message.reference and message.reference.message_id else None
         )
 
-        state_manager.insert_message(
-            message_id=message.id,
-            channel_id=message.channel.id,
-            guild_id=message.guild.id if message.guild else None,
-            author_id=message.author.id,
-            author_nickname=message.author.display_name,
-            is_bot=message.author.bot,
-            content=self._resolve_mentions(message),
-            timestamp=int(message.created_at.timestamp()),
-            attachment_urls=attachment_urls,
-            reply_to_id=reply_to_id,
-            is_webhook=bool(message.webhook_id),
-        )
+        self._pending_message_rows.append((
+            message.id,
+            message.channel.id,
+            message.guild.id if message.guild else None,
+            message.author.id,
+            message.author.display_name,
+            int(message.author.bot),
+            int(bool(message.webhook_id)),
+            self._resolve_mentions(message),
+            int(message.created_at.timestamp()),
+            attachment_urls,
+            reply_to_id,
+        ))
+        if self._message_flush is None:
+            self._message_flush = asyncio.ensure_future(self._flush_message_rows())
+        await asyncio.shield(self._message_flush)
+
+    async def _flush_message_rows(self) -> None:
+        """Write every message row queued during this loop iteration in one transaction."""
+        await asyncio.sleep(0)
+        rows, self._pending_message_rows = self._pending_message_rows, []
+        self._message_flush = None
+        await state_manager.run(state_manager.insert_messages, rows)
 
     async def _save_attachments(self, message: discord.Message, channel_name: str) -> list[str]:
         """Download message attachments to the channel's attachments directory.
@@ -479,27 +628,93 @@ class WendyBot(commands.Bot):
             return []
 
         att_dir = attachments_dir(channel_name)
-        att_dir.mkdir(parents=True, exist_ok=True)
+        if channel_name not in self._att_dirs_ready:
+            att_dir.mkdir(parents=True, exist_ok=True)
+            self._att_dirs_ready.add(channel_name)
+        targets = [
+            (attachment, att_dir / f"msg_{message.id}_{i}_{attachment.filename}")
+            for i, attachment in enumerate(message.attachments)
+        ]
+        results = await asyncio.gather(
+            *(self._download_attachment(attachment, filepath) for attachment, filepath in targets),
+            return_exceptions=True,
+        )
+
         saved: list[str] = []
+        for (attachment, filepath), result in zip(targets, results):
+            if isinstance(result, BaseException):
+                _LOG.error("Failed to save attachment %s: %s", attachment.filename, result)
+                continue
+            saved.append(str(filepath))
+            _LOG.info("Saved attachment: %s (%d bytes)", filepath, result)
 
-        for i, attachment in enumerate(message.attachments):
-            try:
-                filepath = att_dir / f"msg_{message.id}_{i}_{attachment.filename}"
-                data = await attachment.read()
-                filepath.write_bytes(data)
-                saved.append(str(filepath))
-                _LOG.info("Saved attachment: %s (%d bytes)", filepath, len(data))
-            except Exception as e:
-                _LOG.error("Failed to save attachment %s: %s", attachment.filename, e)
+        await asyncio.gather(*(_wait_for_file(Path(path_str)) for path_str in saved))
+        return saved
 
-        for path_str in saved:
-            p = Path(path_str)
-            for _ in range(3):
-                if p.exists():
-                    break
-                await asyncio.sleep(0.1)
+    async def _download_attachment(self, attachment: discord.Attachment, filepath: Path) -> int:
+        """Stream an attachment to *filepath* in chunks and return the bytes written.
 
-        return saved
+        Avoids holding the whole file in memory, which ``attachment.read()``
+        would do for uploads of up to 25 MB. Disk writes run in a worker
+        thread so a slow filesystem can't stall the event loop. Falls back to
+        the media proxy copy (discord.py's ``use_cached``) if the CDN URL
+        is rejected, e.g. because the message was deleted meanwhile.
+        """
+        if self._http_session is None:
+            return await attachment.save(filepath, use_cached=True)
+
+        try:
+            return await self._fetch_with_retry(attachment.url, filepath)
+        except aiohttp.ClientResponseError as e:
+            if not attachment.proxy_url or attachment.proxy_url == attachment.url:
+                raise
+            _LOG.warning("CDN fetch for %s failed (%s), retrying via media proxy", attachment.filename, e.status)
+            return await self._fetch_with_retry(attachment.proxy_url, filepath)
+
+    async def _fetch_with_retry(self, url: str, filepath: Path) -> int:
+        """:meth:`_stream_to_file` with backoff on 429/5xx, honouring ``Retry-After``."""
+        for attempt in range(_ATTACHMENT_FETCH_ATTEMPTS - 1):
+            try:
+                return await self._stream_to_file(url, filepath)
+            except aiohttp.ClientResponseError as e:
+                if e.status != 429 and e.status < 500:
+                    raise
+                delay = _retry_delay(e, attempt)
+                _LOG.warning("Attachment fetch got %s, retrying in %.1fs", e.status, delay)
+                await asyncio.sleep(delay)
+        return await self._stream_to_file(url, filepath)
+
+    async def _stream_to_file(self, url: str, filepath: Path) -> int:
+        """Download *url* into *filepath* chunk by chunk and return the bytes written.
+
+        Chunks land in a hidden ``.part`` sibling that is renamed into place
+        once the body is complete, so an interrupted download never leaves a
+        truncated file matching the ``msg_{id}_*`` attachment pattern.
+        Chunks are gathered into ``_ATTACHMENT_FLUSH_SIZE`` writes so the
+        worker-thread hop isn't paid per network chunk.
+        """
+        part_path = filepath.with_name(f".{filepath.name}.part")
+        written = 0
+        async with self._http_session.get(url) as resp:
+            resp.raise_for_status()
+            f = await asyncio.to_thread(open, part_path, "wb")
+            try:
+                pending = bytearray()
+                async for chunk in resp.content.iter_chunked(_ATTACHMENT_CHUNK_SIZE):
+                    pending += chunk
+                    written += len(chunk)
+                    if len(pending) >= _ATTACHMENT_FLUSH_SIZE:
+                        await asyncio.to_thread(f.write, pending)
+                        pending.clear()
+                if pending:
+                    await asyncio.to_thread(f.write, pending)
+            except BaseException:
+                await asyncio.to_thread(f.close)
+                part_path.unlink(missing_ok=True)
+                raise
+            await asyncio.to_thread(f.close)
+        part_path.replace(filepath)
+        return written
 
     def _resolve_thread_config(self, message: discord.Message) -> dict | None:
         """Build a channel config dict for a thread, inheriting from its parent.
@@ -546,6 +761,7 @@ class WendyBot(commands.Bot):
         is_new = not thread_dir.exists()
 
         ensure_channel_dirs(folder_name, beads_enabled=thread_config.get("beads_enabled", False))
+        self._att_dirs_ready.add(folder_name)
 
         if is_new:
             parent_md = claude_md_path(thread_config["_parent_folder"])
@@ -557,23 +773,55 @@ class WendyBot(commands.Bot):
     # Generation lifecycle
     # ------------------------------------------------------------------
 
-    @staticmethod
-    def _job_is_running(job: GenerationJob | None) -> bool:
-        """Return True if the given generation job has an active (non-done) task."""
-        return job is not None and job.task is not None and not job.task.done()
+    def _running_job(self, channel_id: int) -> GenerationJob | None:
+        """Return the channel's job if its task is still running, else None.
+
+        A finished job left behind (e.g. one whose task died before
+        ``_finalize_generation`` ran) is dropped so the dict only ever holds
+        live generations.
+        """
+        job = self._active_generations.get(channel_id)
+        if job is None or job.task is None:
+            return None
+        if job.task.done():
+            del self._active_generations[channel_id]
+            return None
+        return job
 
     def _start_generation(
         self,
         channel: discord.TextChannel | discord.Thread,
         channel_config: dict,
-    ) -> None:
-        """Create a new GenerationJob and schedule it on the event loop."""
-        model_override = channel_config.get("model")
+    ) -> bool:
+        """Start a generation unless one is already running; return whether it started."""
+        job = self._try_claim(channel.id)
+        if job is None:
+            return False
+        self._launch_generation(channel, job, channel_config.get("model"))
+        return True
+
+    def _try_claim(self, channel_id: int) -> GenerationJob | None:
+        """Register and return a fresh job for *channel_id*, or None if one is running.
+
+        The check and the insert happen without yielding to the event loop, so
+        two events for the same channel can never both start a CLI run.
+        """
+        if self._running_job(channel_id) is not None:
+            return None
         job = GenerationJob()
-        task = self.loop.create_task(
+        self._active_generations[channel_id] = job
+        return job
+
+    def _launch_generation(
+        self,
+        channel: discord.TextChannel | discord.Thread,
+        job: GenerationJob,
+        model_override: str | None = None,
+    ) -> None:
+        """Schedule ``_generate_response`` for *job* and register it as the channel's active job."""
+        job.task = self.loop.create_task(
             self._generate_response(channel, job, model_override=model_override)
         )
-        job.task = task
         self._active_generations[channel.id] = job
 
     def _interrupt_channel(
@@ -603,11 +851,7 @@ class WendyBot(commands.Bot):
             f"Whatever you were doing may not be finished.]",
         )
 
-        model_override = channel_config.get("model")
-        new_task = self.loop.create_task(
-            self._generate_response(message.channel, new_job, model_override=model_override)
-        )
-        new_job.task = new_task
+        self._launch_generation(message.channel, new_job, channel_config.get("model"))
 
     async def _maybe_update_presence(self) -> None:
         """Refresh the bot's Discord status with usage percentages (at most every 15 min)."""
@@ -634,7 +878,8 @@ class WendyBot(commands.Bot):
         Reads from the usage_data.json file maintained by the TaskRunner's
         ``_check_usage`` loop.  Returns ``("N/A", "N/A", "")`` if the cached
         file is missing or unreadable (does NOT call get_usage.sh directly,
-        since the API may be unavailable due to token scope issues).
+        since the API may be unavailable due to token scope issues). The JSON
+        is only re-parsed when the file's mtime changes.
 
         pace = floor(elapsed_week_pct) - week_all_percent: positive means budget
         ahead of pace, negative means deficit. Updates ``_cached_usage`` on success.
@@ -645,11 +890,18 @@ class WendyBot(commands.Bot):
         usage_file = WENDY_BASE / "usage_data.json"
 
         data = None
-        if usage_file.exists():
+        try:
+            mtime_ns = usage_file.stat().st_mtime_ns
+        except OSError:
+            mtime_ns = 0
+        if mtime_ns and mtime_ns != self._usage_file_mtime_ns:
             try:
-                data = json.loads(usage_file.read_text())
+                self._usage_file_data = json.loads(usage_file.read_bytes())
+                self._usage_file_mtime_ns = mtime_ns
             except (json.JSONDecodeError, OSError):
-                pass
+                self._usage_file_data = None
+        if mtime_ns and self._usage_file_data is not None:
+            data = dict(self._usage_file_data)
 
         if data is None:
             return "N/A", "N/A", ""
@@ -668,19 +920,16 @@ class WendyBot(commands.Bot):
 
         if week_pct is not None and week_resets_str:
             try:
-                resets_at = datetime.datetime.fromisoformat(
-                    week_resets_str.replace("Z", "+00:00")
-                )
+                resets_at = _parse_reset_time(week_resets_str)
                 now = datetime.datetime.now(datetime.UTC)
                 # If resets_at is in the past, the cached percentage is from a
-                # previous billing week.  Project the date forward and treat
-                # usage as 0% for the new week.
+                # previous billing week.  Project the date forward (in one step,
+                # however many weeks behind) and treat usage as 0% for the new week.
                 week_secs = 7 * 24 * 3600
-                week_rolled = False
-                while resets_at <= now:
-                    resets_at += datetime.timedelta(seconds=week_secs)
-                    week_rolled = True
+                week_rolled = resets_at <= now
                 if week_rolled:
+                    weeks_behind = int((now - resets_at).total_seconds() // week_secs) + 1
+                    resets_at += datetime.timedelta(seconds=week_secs * weeks_behind)
                     week_pct = 0
                     week_pct_str = "0%"
                     _cached_usage["week_all_percent"] = 0
@@ -734,8 +983,11 @@ class WendyBot(commands.Bot):
                     messages=recent_msgs,
                     channel_id=str(channel.id),
                 )
-                for intro in intros:
-                    self._insert_synthetic_message(channel.id, "Context", intro)
+                if intros:
+                    await state_manager.run(
+                        state_manager.insert_messages,
+                        [_synthetic_message_row(channel.id, "Context", intro) for intro in intros],
+                    )
 
             if job.is_enrichment:
                 remaining = max(60.0, job.enrichment_end_timestamp - time.time())
@@ -751,7 +1003,7 @@ class WendyBot(commands.Bot):
             # gets killed due to an overloaded error (the CLI's
             # check_messages call advances the watermark before we detect
             # the error, so the retry would see no messages).
-            saved_last_seen = state_manager.get_last_seen(channel.id)
+            saved_last_seen = await state_manager.run(state_manager.get_last_seen, channel.id)
 
             await run_cli(
                 channel_id=channel.id,
@@ -771,7 +1023,7 @@ class WendyBot(commands.Bot):
             if e.overloaded:
                 # Restore the watermark so the retry sees the messages.
                 if saved_last_seen is not None:
-                    state_manager.update_last_seen(channel.id, saved_last_seen)
+                    await state_manager.run(state_manager.update_last_seen, channel.id, saved_last_seen)
                 if model_override != "opus":
                     _LOG.warning("Model overloaded for channel %s, waiting 10s then retrying with opus", channel.id)
                     await asyncio.sleep(10)
@@ -798,8 +1050,7 @@ class WendyBot(commands.Bot):
         error: ClaudeCliError,
     ) -> None:
         """Log or report a CLI error; notify the channel on OAuth expiry."""
-        error_str = str(error).lower()
-        if "oauth" in error_str and "expired" in error_str:
+        if _OAUTH_EXPIRED_RE.search(str(error)):
             asyncio.ensure_future(self._send_oauth_notice(channel))
         else:
             _LOG.error("Claude CLI error: %s", error)
@@ -835,23 +1086,19 @@ class WendyBot(commands.Bot):
                     # Time still left -- re-invoke with a continuation nudge.
                     _LOG.info("Enrichment continuing for channel %s (%.0fs remaining, continuation %d)",
                               channel.id, remaining, job.enrichment_continuation_count + 1)
-                    new_job = GenerationJob()
-                    new_job.is_enrichment = True
-                    new_job.enrichment_end_time = job.enrichment_end_time
-                    new_job.enrichment_end_timestamp = job.enrichment_end_timestamp
-                    new_job.enrichment_continuation = True
-                    new_job.enrichment_continuation_count = job.enrichment_continuation_count + 1
-                    new_task = self.loop.create_task(self._generate_response(channel, new_job))
-                    new_job.task = new_task
-                    self._active_generations[channel.id] = new_job
+                    new_job = GenerationJob(
+                        is_enrichment=True,
+                        enrichment_end_time=job.enrichment_end_time,
+                        enrichment_end_timestamp=job.enrichment_end_timestamp,
+                        enrichment_continuation=True,
+                        enrichment_continuation_count=job.enrichment_continuation_count + 1,
+                    )
+                    self._launch_generation(channel, new_job)
                     return
             # Enrichment over -- inject show-off nudge and start a generation.
             _LOG.info("Enrichment ended for channel %s", channel.id)
             self._insert_synthetic_message(channel.id, "System", build_enrichment_end_nudge())
-            new_job = GenerationJob()
-            new_task = self.loop.create_task(self._generate_response(channel, new_job))
-            new_job.task = new_task
-            self._active_generations[channel.id] = new_job
+            self._launch_generation(channel, GenerationJob())
             return
 
         # Auto-continue if the CLI timed out (up to _MAX_TIMEOUT_CONTINUATIONS).
@@ -866,57 +1113,85 @@ class WendyBot(commands.Bot):
                 "Pick up where you left off -- check messages first.]",
             )
             channel_config = self.channel_configs.get(channel.id, {})
-            new_job = GenerationJob()
-            new_job.continuation_count = job.continuation_count + 1
-            # Carry over pending flag so messages aren't lost.
-            new_job.new_message_pending = job.new_message_pending
-            new_task = self.loop.create_task(
-                self._generate_response(channel, new_job, model_override=channel_config.get("model"))
+            new_job = GenerationJob(
+                continuation_count=job.continuation_count + 1,
+                # Carry over pending flag so messages aren't lost.
+                new_message_pending=job.new_message_pending,
             )
-            new_job.task = new_task
-            self._active_generations[channel.id] = new_job
+            self._launch_generation(channel, new_job, channel_config.get("model"))
             return
 
         if job.new_message_pending and self._has_pending_messages(channel.id):
             _LOG.info("New messages pending in channel %s, starting new generation", channel.id)
-            new_job = GenerationJob()
-            new_task = self.loop.create_task(self._generate_response(channel, new_job))
-            new_job.task = new_task
-            self._active_generations[channel.id] = new_job
+            self._launch_generation(channel, GenerationJob())
         else:
             self._active_generations.pop(channel.id, None)
 
     def _has_pending_messages(self, channel_id: int) -> bool:
         """Return True if the channel has user messages newer than last_seen."""
-        return state_manager.has_pending_messages(channel_id, self.user.id)
+        return state_manager.has_pending_messages(channel_id, self._bot_user_id)
+
+    # ------------------------------------------------------------------
+    # Database maintenance
+    # ------------------------------------------------------------------
+
+    @tasks.loop(minutes=_WAL_CHECKPOINT_MINUTES)
+    async def checkpoint_wal(self) -> None:
+        """Prune old notifications, then fold the WAL back into wendy.db (truncating it only when oversized)."""
+        try:
+            await state_manager.run(state_manager.cleanup_old_notifications, _NOTIFICATION_KEEP_COUNT)
+        except Exception as e:
+            _LOG.warning("Notification cleanup failed: %s", e)
+        try:
+            busy, frames, done = await state_manager.run(state_manager.checkpoint)
+        except Exception as e:
+            _LOG.warning("WAL checkpoint failed: %s", e)
+            return
+        if busy:
+            _LOG.debug("WAL checkpoint partial: %d/%d frames (readers active)", done, frames)
 
     # ------------------------------------------------------------------
     # Notification polling
     # ------------------------------------------------------------------
 
-    @tasks.loop(seconds=5)
+    @tasks.loop()
     async def watch_notifications(self) -> None:
-        """Poll for unseen notifications, insert synthetic messages, and wake channels."""
+        """Wait for a notification signal (or the poll fallback), then process unseen notifications."""
+        try:
+            await asyncio.wait_for(self._notification_event.wait(), timeout=_NOTIFICATION_POLL_INTERVAL)
+            await asyncio.sleep(_NOTIFICATION_COALESCE_WINDOW)
+        except TimeoutError:
+            pass
+        self._notification_event.clear()
+        await self._process_notifications()
+
+    async def _process_notifications(self) -> None:
+        """Insert synthetic messages for unseen notifications and wake channels."""
         if not self.whitelist_channels:
             return
         try:
-            unseen = state_manager.get_unseen_notifications_for_wendy()
+            unseen = await state_manager.run(state_manager.get_unseen_notifications_for_wendy)
             if not unseen:
                 return
 
             _LOG.info("Found %d unseen notifications", len(unseen))
             channels_to_wake: set[int] = set()
-            notification_ids: list[int] = []
-
+            task_completions: list = []
+            webhooks: list = []
             for notif in unseen:
-                notification_ids.append(notif.id)
                 if notif.type == "task_completion":
-                    self._handle_task_notification(notif, channels_to_wake)
+                    task_completions.append(notif)
                 elif notif.type == "webhook":
-                    self._handle_webhook_notification(notif)
+                    webhooks.append(notif)
 
-            if notification_ids:
-                state_manager.mark_notifications_seen_by_wendy(notification_ids)
+            rows: list[tuple] = []
+            for notif in task_completions:
+                self._handle_task_notification(notif, rows, channels_to_wake)
+            for notif in webhooks:
+                self._handle_webhook_notification(notif, rows)
+
+            seen_ids = [notif.id for notif in unseen]
+            await state_manager.run(state_manager.store_notification_messages, rows, seen_ids)
 
             self._wake_channels(channels_to_wake)
         except Exception as e:
@@ -927,16 +1202,12 @@ class WendyBot(commands.Bot):
         """Delay notification polling until the bot is connected."""
         await self.wait_until_ready()
 
-    @tasks.loop(minutes=1)
+    @tasks.loop(time=datetime.time(ENRICHMENT_HOUR_UTC, ENRICHMENT_MINUTE_UTC, tzinfo=datetime.UTC))
     async def check_enrichment_schedule(self) -> None:
-        """Trigger enrichment for eligible channels when the scheduled time arrives."""
-        now = datetime.datetime.now(datetime.UTC)
-        if now.hour != ENRICHMENT_HOUR_UTC or now.minute != ENRICHMENT_MINUTE_UTC:
-            return
-        today = now.date()
+        """Trigger enrichment for eligible channels once a day at the scheduled time."""
+        today = datetime.datetime.now(datetime.UTC).date()
         for channel_id, channel_config in self._enrichment_channels():
-            existing_job = self._active_generations.get(channel_id)
-            if self._job_is_running(existing_job):
+            if self._running_job(channel_id) is not None:
                 continue
             if self._enrichment_last_run_date.get(channel_id) == today:
                 continue
@@ -957,8 +1228,8 @@ class WendyBot(commands.Bot):
 
     def is_enrichment_active(self, channel_id: int) -> bool:
         """Return True if an enrichment session is currently running for channel_id."""
-        job = self._active_generations.get(channel_id)
-        return self._job_is_running(job) and job.is_enrichment
+        job = self._running_job(channel_id)
+        return job is not None and job.is_enrichment
 
     def _start_enrichment(
         self,
@@ -986,28 +1257,20 @@ class WendyBot(commands.Bot):
         end_time_str = fake_end_dt.strftime("%H:%M")
 
         model_override = channel_config.get("model")
-        job = GenerationJob()
-        job.is_enrichment = True
-        job.enrichment_end_time = end_time_str
-        job.enrichment_end_timestamp = time.time() + ENRICHMENT_DURATION
-        task = self.loop.create_task(
-            self._generate_response(channel, job, model_override=model_override)
+        job = GenerationJob(
+            is_enrichment=True,
+            enrichment_end_time=end_time_str,
+            enrichment_end_timestamp=time.time() + ENRICHMENT_DURATION,
         )
-        job.task = task
-        self._active_generations[channel_id] = job
+        self._launch_generation(channel, job, model_override)
         _LOG.info("Enrichment started for channel %d (manual=%s, until=%s UTC)", channel_id, manual, end_time_str)
 
     def _resolve_notification_channel(self, notif_channel_id: int | None) -> int | None:
         """Return a valid channel ID for a notification, falling back to any full-mode channel."""
-        if notif_channel_id:
-            return notif_channel_id
-        for cid, cfg in self.channel_configs.items():
-            if cfg.get("mode") == "full":
-                return cid
-        return next(iter(self.whitelist_channels), None)
-
-    def _handle_task_notification(self, notif, channels_to_wake: set[int]) -> None:
-        """Insert a synthetic message for a task completion and mark the channel for waking."""
+        return notif_channel_id or self._fallback_notification_channel
+
+    def _handle_task_notification(self, notif, rows: list[tuple], channels_to_wake: set[int]) -> None:
+        """Queue a synthetic message row for a task completion and mark the channel for waking."""
         channel_id = self._resolve_notification_channel(notif.channel_id)
         if not channel_id:
             return
@@ -1023,11 +1286,11 @@ class WendyBot(commands.Bot):
             content += f" in {duration}"
         content += ". YOU MUST send a message to the channel announcing this completion."
 
-        self._insert_synthetic_message(channel_id, author, content)
+        rows.append(_synthetic_message_row(channel_id, author, content))
         channels_to_wake.add(channel_id)
 
-    def _handle_webhook_notification(self, notif) -> None:
-        """Insert a synthetic message for a webhook (does not wake the bot)."""
+    def _handle_webhook_notification(self, notif, rows: list[tuple]) -> None:
+        """Queue a synthetic message row for a webhook (does not wake the bot)."""
         channel_id = notif.channel_id
         if not channel_id or channel_id not in self.whitelist_channels:
             return
@@ -1041,19 +1304,40 @@ class WendyBot(commands.Bot):
             elif raw_data:
                 payload_content = f"\n{raw_data}"
 
-        self._insert_synthetic_message(channel_id, author, f"[{author}] {notif.title}{payload_content}")
+        rows.append(_synthetic_message_row(channel_id, author, f"[{author}] {notif.title}{payload_content}"))
 
     def _wake_channels(self, channel_ids: set[int]) -> None:
+        """Queue channels for the wake worker, which coalesces bursts into one wake each."""
+        for channel_id in channel_ids:
+            self._wake_queue.put_nowait(channel_id)
+
+    async def _wake_worker(self) -> None:
+        """Consume queued wake requests, dropping duplicates that arrived together."""
+        while True:
+            channel_ids = {await self._wake_queue.get()}
+            while not self._wake_queue.empty():
+                channel_ids.add(self._wake_queue.get_nowait())
+            try:
+                self._dispatch_wakes(channel_ids)
+            except Exception:
+                _LOG.exception("Failed to wake channels %s", channel_ids)
+
+    def _dispatch_wakes(self, channel_ids: set[int]) -> None:
         """Start or flag a generation for each channel that needs waking."""
         for channel_id in channel_ids:
             channel = self.get_channel(channel_id)
             if not channel:
                 continue
-            existing_job = self._active_generations.get(channel_id)
-            if self._job_is_running(existing_job):
-                existing_job.new_message_pending = True
-            else:
-                self._start_generation(channel, self.channel_configs.get(channel_id, {}))
+            if not self._start_generation(channel, self.channel_configs.get(channel_id, {})):
+                self._active_generations[channel_id].new_message_pending = True
+
+    def request_usage_refresh(self) -> bool:
+        """Ask the task runner to re-check usage on its next poll; return False if it isn't running."""
+        task_runner = getattr(self, "_task_runner", None)
+        if task_runner is None:
+            return False
+        task_runner.request_usage_refresh()
+        return True
 
     # ------------------------------------------------------------------
     # Self-wake scheduling
@@ -1081,10 +1365,9 @@ class WendyBot(commands.Bot):
     async def _fire_wake(self, channel_id: int, message: str) -> None:
         """Fire a scheduled wake: inject synthetic message and trigger generation."""
         self._pending_wakes.pop(channel_id, None)
-        self._insert_synthetic_message(
-            channel_id,
-            "Self-Wake",
-            f"[Scheduled wake] {message}",
+        await state_manager.run(
+            state_manager.insert_messages,
+            [_synthetic_message_row(channel_id, "Self-Wake", f"[Scheduled wake] {message}")],
         )
         _LOG.info("Self-wake fired for channel %s: %s", channel_id, message[:80])
         self._wake_channels({channel_id})
@@ -1098,25 +1381,34 @@ class WendyBot(commands.Bot):
     ) -> None:
         """Insert a fake message into SQLite so it appears in check_messages responses.
 
-        IDs start at 9e18 to stay out of the way of real Discord snowflakes.
+        Callers are synchronous, so the write is queued on the state manager's
+        DB thread rather than committed here on the event loop. The DB thread
+        runs work in submission order, so the row lands before any
+        check_messages the generation launched afterwards can issue.
         """
-        global _synthetic_counter
-        _synthetic_counter += 1
-        synthetic_id = 9_000_000_000_000_000_000 + int(time.time_ns() // 1000) + _synthetic_counter
-        state_manager.insert_message(
-            message_id=synthetic_id,
-            channel_id=channel_id,
-            guild_id=guild_id,
-            author_id=0,
-            author_nickname=author,
-            is_bot=False,
-            content=content,
-            timestamp=int(time.time()),
-        )
+        row = _synthetic_message_row(channel_id, author, content, guild_id)
+        asyncio.ensure_future(self._write_synthetic_row(row))
+
+    @staticmethod
+    async def _write_synthetic_row(row: tuple) -> None:
+        """Commit one synthetic message row on the DB thread, logging failures."""
+        try:
+            await state_manager.run(state_manager.insert_messages, [row])
+        except Exception:
+            _LOG.exception("Failed to insert synthetic message for channel %s", row[1])
 
     async def _cache_emojis(self) -> None:
-        """Write all guild emojis to a JSON file for the ``/api/emojis`` endpoint."""
+        """Write the initial emoji cache once the guild list is available."""
         await self.wait_until_ready()
+        await self._write_emoji_cache()
+
+    async def _write_emoji_cache(self) -> None:
+        """Write all guild emojis to a JSON file for the ``/api/emojis`` endpoint.
+
+        Built from discord.py's in-memory guild cache, so it costs no API
+        calls; the file is only rewritten (atomically, off the loop) when the
+        serialized list actually changed.
+        """
         try:
             all_emojis = [
                 {
@@ -1129,8 +1421,11 @@ class WendyBot(commands.Bot):
                 for emoji in guild.emojis
             ]
 
-            from .paths import SHARED_DIR
-            (SHARED_DIR / "emojis.json").write_text(json.dumps(all_emojis))
+            payload = json.dumps(all_emojis)
+            if payload == self._emoji_cache_json:
+                return
+            await asyncio.to_thread(write_text_atomic, api_server.EMOJI_CACHE_FILE, payload)
+            self._emoji_cache_json = payload
             _LOG.info("Cached %d emojis", len(all_emojis))
         except Exception as e:
             _LOG.error("Failed to cache emojis: %s", e)
@@ -5,6 +5,7 @@ Port of v1 fragment_loader.py -- nearly verbatim since it's already clean.
 from __future__ import annotations
 
 import dataclasses
+import functools
 import json
 import logging
 import re
@@ -52,6 +53,15 @@ class Fragment:
 
 _FRONTMATTER_RE = re.compile(r"^---\s*\n(.*?)\n---\s*\n", re.DOTALL)
 
+# Splits a people/ filename stem into name parts for auto-derived keywords.
+_STEM_SPLIT_RE = re.compile(r"[_\-\s]+")
+
+
+@functools.lru_cache(maxsize=1024)
+def _word_boundary_re(keyword: str) -> re.Pattern[str]:
+    """Compiled ``\\b<keyword>\\b`` matcher for person-fragment keywords."""
+    return re.compile(r"\b" + re.escape(keyword) + r"\b")
+
 
 def parse_frontmatter(text: str) -> tuple[dict | None, str]:
     """Split YAML frontmatter from content body."""
@@ -191,7 +201,7 @@ def matches_context(fragment: Fragment, messages: list[dict],
         kw_lower = kw.lower()
         # Person fragments use word-boundary matching to avoid short-name false positives
         if fragment.type == "person":
-            if re.search(r"\b" + re.escape(kw_lower) + r"\b", combined):
+            if _word_boundary_re(kw_lower).search(combined):
                 return True
         else:
             if kw_lower in combined:
@@ -234,7 +244,7 @@ def _load_people_dir(people_dir: Path) -> list[Fragment]:
 
         # Auto-derive: no valid frontmatter -- treat whole file as person entry
         stem = f.stem
-        parts = re.split(r"[_\-\s]+", stem)
+        parts = _STEM_SPLIT_RE.split(stem)
         keywords = list(dict.fromkeys([stem] + [p for p in parts if p]))
         frags.append(Fragment(
             path=f,
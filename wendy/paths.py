@@ -5,8 +5,12 @@ Leaf module -- zero internal imports.
 """
 from __future__ import annotations
 
+import functools
+import heapq
 import os
 import re
+import threading
+from collections.abc import Iterable
 from pathlib import Path
 
 # =============================================================================
@@ -42,6 +46,12 @@ def _encode_path_for_claude(path: Path) -> str:
 
 CHANNEL_NAME_PATTERN = re.compile(r"^[a-zA-Z0-9_-]+$")
 
+# The per-channel path helpers below are pure functions of the channel name
+# (the base directories are fixed at import), and sit on hot paths such as
+# every poll and every message. Each is memoised so repeat calls return the
+# same immutable Path instead of re-running PurePath joins.
+_path_cache = functools.lru_cache(maxsize=256)
+
 
 def validate_channel_name(name: str) -> bool:
     if not name:
@@ -49,28 +59,34 @@ def validate_channel_name(name: str) -> bool:
     return bool(CHANNEL_NAME_PATTERN.match(name))
 
 
+@_path_cache
 def channel_dir(name: str) -> Path:
     return CHANNELS_DIR / name
 
 
+@_path_cache
 def beads_dir(channel_name: str) -> Path:
     return channel_dir(channel_name) / ".beads"
 
 
+@_path_cache
 def session_dir(channel_name: str) -> Path:
     channel_path = channel_dir(channel_name)
     encoded = _encode_path_for_claude(channel_path)
     return CLAUDE_PROJECTS_DIR / encoded
 
 
+@_path_cache
 def current_session_file(channel_name: str) -> Path:
     return channel_dir(channel_name) / ".current_session"
 
 
+@_path_cache
 def claude_md_path(channel_name: str) -> Path:
     return channel_dir(channel_name) / "CLAUDE.md"
 
 
+@_path_cache
 def attachments_dir(channel_name: str) -> Path:
     return channel_dir(channel_name) / "attachments"
 
@@ -79,6 +95,7 @@ def fragments_dir() -> Path:
     return FRAGMENTS_DIR
 
 
+@_path_cache
 def journal_dir(channel_name: str) -> Path:
     return channel_dir(channel_name) / "journal"
 
@@ -104,6 +121,61 @@ def ensure_channel_dirs(channel_name: str, beads_enabled: bool = False) -> None:
                 pass
 
 
+def write_text_atomic(path: Path, text: str) -> None:
+    """Write *text* to *path* via a temp file + rename so readers never see a partial file.
+
+    The temp name is unique per process and thread, so concurrent writers of
+    the same *path* never share (and replace) each other's half-written file;
+    the last rename wins with a complete payload.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_text(text)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def files_by_mtime(directory: Path, *, prefix: str = "", suffix: str = "") -> list[tuple[float, str]]:
+    """Return ``(mtime, path)`` for files in *directory* matching *prefix*/*suffix*, oldest first.
+
+    Uses a single ``os.scandir`` pass with plain string matching instead of
+    ``Path.glob``, and skips entries that vanish mid-scan.
+    """
+    found = _scan_mtimes(directory, prefix, suffix)
+    found.sort()
+    return found
+
+
+def files_beyond_newest(directory: Path, keep: int, *, prefix: str = "", suffix: str = "") -> list[str]:
+    """Return paths of the matching files older than the newest *keep*, for pruning.
+
+    Picks just the excess with ``heapq.nsmallest`` rather than sorting the
+    whole listing -- rotation usually evicts one or two files out of many.
+    """
+    found = _scan_mtimes(directory, prefix, suffix)
+    excess = len(found) - keep
+    if excess <= 0:
+        return []
+    return [path for _, path in heapq.nsmallest(excess, found)]
+
+
+def _scan_mtimes(directory: Path, prefix: str, suffix: str) -> list[tuple[float, str]]:
+    found: list[tuple[float, str]] = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            name = entry.name
+            if not (name.startswith(prefix) and name.endswith(suffix)):
+                continue
+            try:
+                if entry.is_file():
+                    found.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+    return found
+
+
 def find_attachments_for_message(message_id: int, channel_name: str | None = None) -> list[str]:
     """Return sorted list of attachment file paths for a given message.
 
@@ -111,12 +183,39 @@ def find_attachments_for_message(message_id: int, channel_name: str | None = Non
     ``msg_{message_id}_*`` pattern.  Returns an empty list when no
     *channel_name* is given or the directory does not exist.
     """
+    return find_attachments_for_messages([message_id], channel_name).get(message_id, [])
+
+
+def find_attachments_for_messages(message_ids: Iterable[int], channel_name: str | None = None) -> dict[int, list[str]]:
+    """Return ``{message_id: sorted paths}`` for every id in *message_ids* that has attachments.
+
+    Lists the attachments directory once with ``os.scandir`` and buckets
+    entries by the id in their ``msg_{message_id}_*`` name, rather than
+    globbing the directory once per message.
+    """
     if not channel_name:
-        return []
-    att_dir = attachments_dir(channel_name)
-    if not att_dir.exists():
-        return []
-    return sorted(str(f) for f in att_dir.glob(f"msg_{message_id}_*"))
+        return {}
+    wanted = set(message_ids)
+    if not wanted:
+        return {}
+    found: dict[int, list[str]] = {}
+    try:
+        with os.scandir(attachments_dir(channel_name)) as it:
+            for entry in it:
+                prefix, sep, rest = entry.name.partition("_")
+                if prefix != "msg" or not sep:
+                    continue
+                id_part, sep, _ = rest.partition("_")
+                if not sep or not id_part.isdigit():
+                    continue
+                message_id = int(id_part)
+                if message_id in wanted:
+                    found.setdefault(message_id, []).append(entry.path)
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+    for paths in found.values():
+        paths.sort()
+    return found
 
 
 def ensure_shared_dirs() -> None:
@@ -4,13 +4,18 @@ ONE schema definition. No duplicates anywhere.
 """
 from __future__ import annotations
 
+import asyncio
+import functools
 import json
 import logging
 import os
 import sqlite3
 import threading
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any
 
 from .models import Notification, SessionInfo
 from .paths import DB_PATH as DEFAULT_DB_PATH
@@ -20,6 +25,64 @@ _LOG = logging.getLogger(__name__)
 _env_db_path = os.getenv("WENDY_DB_PATH")
 _DEFAULT_DB_PATH = Path(_env_db_path) if _env_db_path else DEFAULT_DB_PATH
 
+# Applied to every new connection. journal_mode persists in the file, the rest
+# are per-connection. busy_timeout comes from sqlite3.connect(timeout=...).
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    # Let the WAL grow to ~40 MB before a commit pays for a checkpoint; the
+    # bot truncates it on a timer instead (see checkpoint()).
+    "PRAGMA wal_autocheckpoint=10000",
+)
+
+# Bump whenever the schema or migrations below change; databases already at
+# this version skip the DDL entirely on startup.
+_SCHEMA_VERSION = 2
+
+_INSERT_MESSAGE_SQL = """
+    INSERT OR IGNORE INTO message_history
+        (message_id, channel_id, guild_id, author_id, author_nickname,
+         is_bot, is_webhook, content, timestamp, attachment_urls, reply_to_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Watermark writes update the existing row in place. ``INSERT OR REPLACE``
+# would delete and re-insert it on every check_messages call.
+_UPSERT_LAST_SEEN_SQL = """
+    INSERT INTO channel_last_seen (channel_id, last_message_id, updated_at)
+    VALUES (?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(channel_id) DO UPDATE SET
+        last_message_id = excluded.last_message_id,
+        updated_at = excluded.updated_at
+"""
+
+# Id-list statements bind the whole list as one JSON array parameter, so the
+# SQL text is the same for every batch size (one cached statement) and each
+# call is still a single execution rather than one per id.
+_DELETE_MESSAGES_SQL = (
+    "DELETE FROM message_history WHERE message_id IN (SELECT value FROM json_each(?))"
+)
+_MARK_SEEN_BY_WENDY_SQL = (
+    "UPDATE notifications SET seen_by_wendy = 1 WHERE id IN (SELECT value FROM json_each(?))"
+)
+_MARK_SEEN_BY_PROXY_SQL = (
+    "UPDATE notifications SET seen_by_proxy = 1 WHERE id IN (SELECT value FROM json_each(?))"
+)
+
+# The periodic checkpoint runs PASSIVE, which never waits on readers. Only a WAL
+# grown past this size escalates to TRUNCATE, and then with a short busy
+# timeout, so other DB-thread calls don't queue behind the dashboard's reads.
+_WAL_TRUNCATE_BYTES = 64 * 1024 * 1024
+_CHECKPOINT_BUSY_TIMEOUT_MS = 1000
+_BUSY_TIMEOUT_MS = 30000
+
+# Per-connection prepared-statement cache size. The handful of hot queries
+# below are module/class constants so their text (the cache key) is stable.
+_CACHED_STATEMENTS = 256
+
 
 class StateManager:
     """Thread-safe SQLite state manager with a single schema definition."""
@@ -29,17 +92,26 @@ class StateManager:
         self._local = threading.local()
         self._lock = threading.Lock()
         self._initialized = False
+        self._db_dir_ready = False
+        self._executor: ThreadPoolExecutor | None = None
+        # thread_id -> folder_name. A thread's folder never changes once
+        # registered, so channel-name lookups for threads skip the DB.
+        self._thread_folders: dict[int, str] = {}
 
     def _get_conn(self) -> sqlite3.Connection:
         if not hasattr(self._local, "conn") or self._local.conn is None:
-            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            if not self._db_dir_ready:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                self._db_dir_ready = True
             self._local.conn = sqlite3.connect(
                 self.db_path,
                 check_same_thread=False,
-                timeout=30.0,
+                timeout=_BUSY_TIMEOUT_MS / 1000,
+                cached_statements=_CACHED_STATEMENTS,
             )
             self._local.conn.row_factory = sqlite3.Row
-            self._local.conn.execute("PRAGMA journal_mode=WAL")
+            for pragma in _CONNECTION_PRAGMAS:
+                self._local.conn.execute(pragma)
 
         if not self._initialized:
             with self._lock:
@@ -49,9 +121,61 @@ class StateManager:
 
         return self._local.conn
 
+    async def run(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking StateManager call on the dedicated DB thread and await it.
+
+        Every async caller shares one worker thread -- and so one long-lived
+        connection -- instead of opening a connection per default-pool thread.
+        Calls run in submission order.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wendy-db")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def checkpoint(self, truncate_over: int = _WAL_TRUNCATE_BYTES) -> tuple[int, int, int]:
+        """Checkpoint the WAL into the main database.
+
+        Runs a PASSIVE checkpoint, which copies what it can without waiting
+        on readers. When the WAL file is larger than *truncate_over* bytes it
+        escalates to TRUNCATE to shrink the file, waiting at most
+        ``_CHECKPOINT_BUSY_TIMEOUT_MS`` for readers instead of the usual 30s.
+
+        Returns SQLite's ``(busy, wal_frames, checkpointed_frames)`` row.
+        """
+        conn = self._get_conn()
+        try:
+            wal_size = os.stat(f"{self.db_path}-wal").st_size
+        except FileNotFoundError:
+            wal_size = 0
+        if wal_size <= truncate_over:
+            return tuple(conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone())
+        conn.execute(f"PRAGMA busy_timeout={_CHECKPOINT_BUSY_TIMEOUT_MS}")
+        try:
+            return tuple(conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone())
+        finally:
+            conn.execute(f"PRAGMA busy_timeout={_BUSY_TIMEOUT_MS}")
+
+    def _close_thread_conn(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def close(self) -> None:
+        """Close the DB thread's connection and stop the DB thread."""
+        if self._executor is not None:
+            self._executor.submit(self._close_thread_conn).result()
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
     def _init_schema(self, conn: sqlite3.Connection) -> None:
         """Initialize database schema. THIS IS THE ONLY SCHEMA DEFINITION."""
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= _SCHEMA_VERSION:
+            return
         conn.executescript("""
+            BEGIN;
+
             CREATE TABLE IF NOT EXISTS channel_sessions (
                 channel_id INTEGER PRIMARY KEY,
                 session_id TEXT NOT NULL,
@@ -89,6 +213,14 @@ class StateManager:
             CREATE INDEX IF NOT EXISTS idx_message_history_channel
                 ON message_history(channel_id, message_id);
 
+            -- Read-only alias for the old cache table name used by ad-hoc queries.
+            -- message_history is the only place messages are stored.
+            CREATE VIEW IF NOT EXISTS cached_messages AS
+                SELECT message_id, channel_id, guild_id, author_id,
+                       author_nickname AS author_name, is_bot, is_webhook,
+                       content, timestamp, attachment_urls, reply_to_id
+                FROM message_history;
+
             CREATE TABLE IF NOT EXISTS notifications (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 type TEXT NOT NULL,
@@ -149,14 +281,17 @@ class StateManager:
             );
             CREATE INDEX IF NOT EXISTS idx_session_history_channel
                 ON session_history(channel_id, started_at);
+
+            COMMIT;
         """)
-        conn.commit()
         # Migrations for columns added after initial deploy
         try:
             conn.execute("ALTER TABLE thread_registry ADD COLUMN thread_name TEXT")
             conn.commit()
         except Exception:
             pass  # column already exists
+        conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        conn.commit()
         _LOG.info("Schema initialized at %s", self.db_path)
 
     # =========================================================================
@@ -274,13 +409,7 @@ class StateManager:
 
     def update_last_seen(self, channel_id: int, message_id: int) -> None:
         conn = self._get_conn()
-        conn.execute(
-            """
-            INSERT OR REPLACE INTO channel_last_seen (channel_id, last_message_id, updated_at)
-            VALUES (?, ?, CURRENT_TIMESTAMP)
-            """,
-            (channel_id, message_id)
-        )
+        conn.execute(_UPSERT_LAST_SEEN_SQL, (channel_id, message_id))
         conn.commit()
 
     def reset_last_seen(self, channel_id: int) -> None:
@@ -307,17 +436,22 @@ class StateManager:
         reply_to_id: int | None = None,
         is_webhook: bool = False,
     ) -> None:
-        conn = self._get_conn()
-        conn.execute(
-            """
-            INSERT OR IGNORE INTO message_history
-                (message_id, channel_id, guild_id, author_id, author_nickname,
-                 is_bot, is_webhook, content, timestamp, attachment_urls, reply_to_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
+        self.insert_messages([
             (message_id, channel_id, guild_id, author_id, author_nickname,
              int(is_bot), int(is_webhook), content, timestamp, attachment_urls, reply_to_id)
-        )
+        ])
+
+    def insert_messages(self, rows: list[tuple]) -> None:
+        """Insert several messages in one transaction.
+
+        Each row is ``(message_id, channel_id, guild_id, author_id,
+        author_nickname, is_bot, is_webhook, content, timestamp,
+        attachment_urls, reply_to_id)`` with the booleans as ints.
+        """
+        if not rows:
+            return
+        conn = self._get_conn()
+        conn.executemany(_INSERT_MESSAGE_SQL, rows)
         conn.commit()
 
     def update_message_content(self, message_id: int, content: str) -> None:
@@ -357,11 +491,18 @@ class StateManager:
         if not message_ids:
             return
         conn = self._get_conn()
-        placeholders = ",".join("?" * len(message_ids))
-        conn.execute(
-            f"DELETE FROM message_history WHERE message_id IN ({placeholders})",
-            message_ids
-        )
+        conn.execute(_DELETE_MESSAGES_SQL, (json.dumps(message_ids),))
+        conn.commit()
+
+    def consume_messages(self, channel_id: int, last_seen_id: int | None, synthetic_ids: list[int]) -> None:
+        """Advance the channel's watermark and delete consumed synthetics in one transaction."""
+        if last_seen_id is None and not synthetic_ids:
+            return
+        conn = self._get_conn()
+        if last_seen_id is not None:
+            conn.execute(_UPSERT_LAST_SEEN_SQL, (channel_id, last_seen_id))
+        if synthetic_ids:
+            conn.execute(_DELETE_MESSAGES_SQL, (json.dumps(synthetic_ids),))
         conn.commit()
 
     # -------------------------------------------------------------------------
@@ -383,6 +524,12 @@ class StateManager:
         AND (m.content IS NULL OR (m.content NOT LIKE '!%' AND m.content NOT LIKE '-%'))
     """
 
+    _REAL_MESSAGES_SINCE_SQL = _MESSAGE_QUERY_BASE + (
+        " AND m.message_id > ? AND m.message_id < ? ORDER BY m.message_id DESC LIMIT ?"
+    )
+    _REAL_MESSAGES_SQL = _MESSAGE_QUERY_BASE + " AND m.message_id < ? ORDER BY m.message_id DESC LIMIT ?"
+    _SYNTHETIC_MESSAGES_SQL = _MESSAGE_QUERY_BASE + " AND m.message_id >= ? ORDER BY m.message_id ASC"
+
     @staticmethod
     def _row_to_message_dict(
         row: sqlite3.Row,
@@ -430,17 +577,17 @@ class StateManager:
 
         # Fetch real messages (below synthetic threshold) with the limit.
         if since_id is not None:
-            real_query = self._MESSAGE_QUERY_BASE + " AND m.message_id > ? AND m.message_id < ? ORDER BY m.message_id DESC LIMIT ?"
+            real_query = self._REAL_MESSAGES_SINCE_SQL
             real_params = (channel_id, since_id, synthetic_threshold, limit)
         else:
-            real_query = self._MESSAGE_QUERY_BASE + " AND m.message_id < ? ORDER BY m.message_id DESC LIMIT ?"
+            real_query = self._REAL_MESSAGES_SQL
             real_params = (channel_id, synthetic_threshold, limit)
         real_rows = conn.execute(real_query, real_params).fetchall()
 
         # Fetch all pending synthetic messages (they get deleted after consumption).
-        synth_query = self._MESSAGE_QUERY_BASE + " AND m.message_id >= ? ORDER BY m.message_id ASC"
-        synth_params = (channel_id, synthetic_threshold)
-        synth_rows = conn.execute(synth_query, synth_params).fetchall()
+        synth_rows = conn.execute(
+            self._SYNTHETIC_MESSAGES_SQL, (channel_id, synthetic_threshold)
+        ).fetchall()
 
         # Combine: all results in message_id DESC order.
         combined = list(synth_rows)[::-1] + list(real_rows)
@@ -562,6 +709,22 @@ class StateManager:
         ).fetchall()
         return [self._row_to_notification(row) for row in rows]
 
+    def claim_notifications_for_proxy(self) -> list[Notification]:
+        """Mark every unseen-by-proxy notification seen and return them, oldest first.
+
+        A single ``UPDATE ... RETURNING`` statement, so a notification inserted
+        by another process between a read and a mark can neither be skipped
+        nor handed out twice.
+        """
+        conn = self._get_conn()
+        rows = conn.execute(
+            "UPDATE notifications SET seen_by_proxy = 1 WHERE seen_by_proxy = 0 RETURNING *"
+        ).fetchall()
+        conn.commit()
+        notifications = [self._row_to_notification(row) for row in rows]
+        notifications.sort(key=lambda n: n.id)
+        return notifications
+
     def _row_to_notification(self, row: sqlite3.Row) -> Notification:
         return Notification(
             id=row["id"],
@@ -575,37 +738,41 @@ class StateManager:
             created_at=row["created_at"],
         )
 
+    def store_notification_messages(self, rows: list[tuple], notification_ids: list[int]) -> None:
+        """Insert the synthetic rows for a batch of notifications and mark them seen, in one transaction."""
+        if not rows and not notification_ids:
+            return
+        conn = self._get_conn()
+        conn.executemany(_INSERT_MESSAGE_SQL, rows)
+        if notification_ids:
+            conn.execute(_MARK_SEEN_BY_WENDY_SQL, (json.dumps(notification_ids),))
+        conn.commit()
+
     def mark_notifications_seen_by_wendy(self, notification_ids: list[int]) -> None:
         if not notification_ids:
             return
         conn = self._get_conn()
-        placeholders = ",".join("?" * len(notification_ids))
-        conn.execute(
-            f"UPDATE notifications SET seen_by_wendy = 1 WHERE id IN ({placeholders})",
-            notification_ids
-        )
+        conn.execute(_MARK_SEEN_BY_WENDY_SQL, (json.dumps(notification_ids),))
         conn.commit()
 
     def mark_notifications_seen_by_proxy(self, notification_ids: list[int]) -> None:
         if not notification_ids:
             return
         conn = self._get_conn()
-        placeholders = ",".join("?" * len(notification_ids))
-        conn.execute(
-            f"UPDATE notifications SET seen_by_proxy = 1 WHERE id IN ({placeholders})",
-            notification_ids
-        )
+        conn.execute(_MARK_SEEN_BY_PROXY_SQL, (json.dumps(notification_ids),))
         conn.commit()
 
     def cleanup_old_notifications(self, keep_count: int = 100) -> None:
         conn = self._get_conn()
+        # Walk the rowid index to the newest-but-keep_count id instead of
+        # sorting the table by created_at; ids are assigned in insert order.
         conn.execute(
             """
             DELETE FROM notifications
-            WHERE id NOT IN (
+            WHERE id <= (
                 SELECT id FROM notifications
-                ORDER BY created_at DESC
-                LIMIT ?
+                ORDER BY id DESC
+                LIMIT 1 OFFSET ?
             )
             """,
             (keep_count,)
@@ -629,12 +796,18 @@ class StateManager:
         conn.commit()
 
     def get_thread_folder(self, thread_id: int) -> str | None:
+        folder = self._thread_folders.get(thread_id)
+        if folder is not None:
+            return folder
         conn = self._get_conn()
         row = conn.execute(
             "SELECT folder_name FROM thread_registry WHERE thread_id = ?",
             (thread_id,)
         ).fetchone()
-        return row["folder_name"] if row else None
+        if row is None:
+            return None
+        self._thread_folders[thread_id] = row["folder_name"]
+        return row["folder_name"]
 
     def get_thread_parent(self, thread_id: int) -> int | None:
         conn = self._get_conn()
@@ -659,8 +832,11 @@ class StateManager:
         conn = self._get_conn()
         conn.execute(
             """
-            INSERT OR REPLACE INTO usage_state (key, value, updated_at)
+            INSERT INTO usage_state (key, value, updated_at)
             VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(key) DO UPDATE SET
+                value = excluded.value,
+                updated_at = excluded.updated_at
             """,
             (key, value)
         )
@@ -10,26 +10,99 @@ import json
 import logging
 import os
 import time
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import IO
+from typing import IO, Any
 
 from .config import CLI_SUBPROCESS_UID, SENSITIVE_ENV_VARS, USAGE_BUDGET_FACTOR, parse_channel_configs, resolve_model
-from .paths import WENDY_BASE, beads_dir, channel_dir, current_session_file, session_dir
+from .paths import (
+    WENDY_BASE,
+    beads_dir,
+    channel_dir,
+    current_session_file,
+    files_beyond_newest,
+    session_dir,
+    write_text_atomic,
+)
 from .state import state as state_manager
 
 _LOG = logging.getLogger(__name__)
 
+
+@dataclass(frozen=True, slots=True)
+class RunnerConfig:
+    """Task runner settings, read from the environment once at import."""
+    concurrency: int
+    poll_interval: int
+    agent_timeout: int
+    notify_channel_id: int | None
+    agent_system_prompt_file: Path
+    closed_task_grace_period: int
+
+    @classmethod
+    def from_env(cls) -> RunnerConfig:
+        """Build the config in one pass over :data:`_RUNNER_ENV_SPEC`."""
+        env = os.environ
+        return cls(**{
+            name: cast(env.get(var, default))
+            for name, var, default, cast in _RUNNER_ENV_SPEC
+        })
+
+
+def _optional_int(value: str) -> int | None:
+    return int(value) if value else None
+
+
+# (RunnerConfig field, environment variable, default, cast)
+_RUNNER_ENV_SPEC: tuple[tuple[str, str, str, Callable[[str], Any]], ...] = (
+    ("concurrency", "ORCHESTRATOR_CONCURRENCY", "3", int),
+    ("poll_interval", "ORCHESTRATOR_POLL_INTERVAL", "30", int),
+    ("agent_timeout", "ORCHESTRATOR_AGENT_TIMEOUT", "14400", int),
+    ("notify_channel_id", "ORCHESTRATOR_NOTIFY_CHANNEL", "", _optional_int),
+    ("agent_system_prompt_file", "AGENT_SYSTEM_PROMPT_FILE", "/app/config/agent_claude_md.txt", Path),
+    ("closed_task_grace_period", "ORCHESTRATOR_CLOSED_GRACE_PERIOD", "5", int),
+)
+
+
 # Configuration
-CONCURRENCY: int = int(os.getenv("ORCHESTRATOR_CONCURRENCY", "3"))
-POLL_INTERVAL: int = int(os.getenv("ORCHESTRATOR_POLL_INTERVAL", "30"))
-AGENT_TIMEOUT: int = int(os.getenv("ORCHESTRATOR_AGENT_TIMEOUT", "14400"))
-NOTIFY_CHANNEL: str = os.getenv("ORCHESTRATOR_NOTIFY_CHANNEL", "")
-AGENT_SYSTEM_PROMPT_FILE: Path = Path(os.getenv("AGENT_SYSTEM_PROMPT_FILE", "/app/config/agent_claude_md.txt"))
+CFG = RunnerConfig.from_env()
+CONCURRENCY: int = CFG.concurrency
+POLL_INTERVAL: int = CFG.poll_interval
+AGENT_TIMEOUT: int = CFG.agent_timeout
+NOTIFY_CHANNEL_ID: int | None = CFG.notify_channel_id
+AGENT_SYSTEM_PROMPT_FILE: Path = CFG.agent_system_prompt_file
 LOG_DIR: Path = WENDY_BASE / "orchestrator_logs"
 MAX_LOG_FILES: int = 50
-CLOSED_TASK_GRACE_PERIOD: int = int(os.getenv("ORCHESTRATOR_CLOSED_GRACE_PERIOD", "5"))
+# Longest a `bd ready`/`bd list` result is reused while the beads dir looks
+# unchanged, in case a change slips past the mtime/size signature.
+BD_CACHE_MAX_AGE: float = 300.0
+# After a poll that spawned agents with capacity to spare, re-poll after
+# POLL_MIN_WAIT instead of POLL_INTERVAL, for at most POLL_BUDGET polls in a
+# row, so tasks created in a burst are picked up together.
+POLL_MIN_WAIT: float = 1.0
+POLL_BUDGET: int = 8
+CLOSED_TASK_GRACE_PERIOD: int = CFG.closed_task_grace_period
+
+# Agent CLI permissions. Only the channel's own directory varies per spawn.
+_AGENT_BASE_TOOLS: tuple[str, ...] = ("Read", "WebSearch", "WebFetch", "Bash", "Glob", "Grep", "TodoWrite")
+_AGENT_SHARED_WRITE_TOOLS: tuple[str, ...] = (
+    "Edit(//data/wendy/claude_fragments/people/**)",
+    "Write(//data/wendy/claude_fragments/people/**)",
+    "Write(//data/wendy/tmp/**)",
+    "Write(//tmp/**)",
+)
+_AGENT_DISALLOWED_TOOLS = "Edit(//app/**),Write(//app/**),Skill,TodoRead"
+
+# Arguments every agent invocation shares, after the prompt and tool allowlist.
+_AGENT_CMD_TAIL: tuple[str, ...] = (
+    "--max-turns", "9999",
+    "--strict-mcp-config",
+    "--disallowedTools", _AGENT_DISALLOWED_TOOLS,
+    "--output-format", "stream-json",
+    "--verbose",
+)
 
 AGENT_PROMPT_TEMPLATE = """================================================================================
 FORKED SESSION - BACKGROUND AGENT (BEAD) MODE
@@ -76,6 +149,17 @@ class ChannelBeads:
     beads_path: Path
     session_path: Path
     current_session_path: Path
+    initialized: bool = field(default=False)
+
+    def is_initialized(self) -> bool:
+        """Return True once ``bd init`` has written config.yaml.
+
+        Only a positive result is cached -- an initialized beads dir doesn't
+        go away -- so polls stop re-stat'ing it every cycle.
+        """
+        if not self.initialized:
+            self.initialized = (self.beads_path / "config.yaml").exists()
+        return self.initialized
 
 
 @dataclass
@@ -125,14 +209,73 @@ def _close_log_file(agent: RunningAgent) -> None:
             agent.log_file = None
 
 
+def _agent_allowed_tools(channel_name: str) -> str:
+    """Return the ``--allowedTools`` value for an agent working in *channel_name*."""
+    channel_glob = f"//data/wendy/channels/{channel_name}/**"
+    return ",".join((
+        *_AGENT_BASE_TOOLS,
+        f"Edit({channel_glob})",
+        f"Write({channel_glob})",
+        *_AGENT_SHARED_WRITE_TOOLS,
+    ))
+
+
+# ((st_mtime_ns, st_size), stripped contents) of AGENT_SYSTEM_PROMPT_FILE as last read.
+_agent_prompt_cache: tuple[tuple[int, int], str] | None = None
+
+
+def _agent_system_prompt() -> str:
+    """Return the stripped agent system prompt, or "" if the file is missing or unreadable.
+
+    One stat per spawn; the file is only re-read when its mtime or size
+    changes, so edits still reach the next agent without a restart.
+    """
+    global _agent_prompt_cache
+    try:
+        st = AGENT_SYSTEM_PROMPT_FILE.stat()
+        key = (st.st_mtime_ns, st.st_size)
+        if _agent_prompt_cache is None or _agent_prompt_cache[0] != key:
+            _agent_prompt_cache = (key, AGENT_SYSTEM_PROMPT_FILE.read_text().strip())
+        return _agent_prompt_cache[1]
+    except Exception:
+        return ""
+
+
+def _write_completion_notification(title: str, channel_id: int | None, payload: dict) -> None:
+    """Record a task-completion notification (runs on the DB thread).
+
+    Old notifications are pruned by the bot's periodic DB maintenance, not here.
+    """
+    state_manager.add_notification(
+        type="task_completion",
+        source="task_runner",
+        title=title,
+        channel_id=channel_id,
+        payload=payload,
+    )
+
+
 class TaskRunner:
     """Polls beads for tasks, spawns agents, monitors completion."""
 
-    def __init__(self) -> None:
+    def __init__(self, on_notification: Callable[[], None] | None = None) -> None:
         self.agents: dict[str, RunningAgent] = {}
+        self._on_notification = on_notification
         self.beads_channels: list[ChannelBeads] = []
         self._last_usage_check: float = 0.0
         self._usage_disabled: bool = False
+        self._usage_refresh_requested: bool = False
+        # Set to cut the between-poll sleep short (agent exit, usage refresh).
+        self._wake = asyncio.Event()
+        self._exit_watchers: set[asyncio.Task] = set()
+        # Consecutive polls that spawned agents with capacity left (see POLL_BUDGET).
+        self._burst: int = 0
+        self._last_snapshot: str | None = None
+        # Agent logs created since the last trim; starts at 1 so the first
+        # poll trims whatever earlier runs left behind.
+        self._logs_since_cleanup: int = 1
+        # (channel, bd subcommand) -> (beads dir signature, fetched at, parsed result)
+        self._bd_cache: dict[tuple[str, str], tuple[frozenset, float, list[dict]]] = {}
         LOG_DIR.mkdir(parents=True, exist_ok=True)
 
     def _load_beads_channels(self) -> list[ChannelBeads]:
@@ -166,7 +309,7 @@ class TaskRunner:
         # existence -- ensure_channel_dirs creates .beads/ via mkdir but bd init
         # populates it with config.yaml, database, etc.)
         for channel in self.beads_channels:
-            if not (channel.beads_path / "config.yaml").exists():
+            if not channel.is_initialized():
                 await self._run_bd(["bd", "init"], channel.name)
 
         try:
@@ -175,28 +318,11 @@ class TaskRunner:
                     await self._check_agents()
                     await self._check_closed_tasks()
 
-                    available = CONCURRENCY - len(self.agents)
-                    if available > 0:
-                        for channel in self.beads_channels:
-                            if available <= 0:
-                                break
-                            tasks = await self._get_ready_tasks(channel)
-                            for task in tasks:
-                                task_id = task.get("id")
-                                if task_id in self.agents:
-                                    continue
-                                if await self._claim_task(task_id, channel.name):
-                                    agent = await self._spawn_agent(task, channel)
-                                    if agent:
-                                        self.agents[task_id] = agent
-                                        available -= 1
-                                    else:
-                                        # Spawn failed -- reopen so task can be retried later.
-                                        # If reopen also fails, the task is stuck in in_progress;
-                                        # the stuck-task sweep below will catch it.
-                                        await self._run_bd(["bd", "reopen", task_id], channel.name)
-                                if available <= 0:
-                                    break
+                    spawned = await self._dispatch_ready_tasks()
+                    if spawned and len(self.agents) < CONCURRENCY:
+                        self._burst += 1
+                    else:
+                        self._burst = 0
 
                     self._cleanup_logs()
                     await self._write_beads_snapshot()
@@ -204,12 +330,87 @@ class TaskRunner:
                 except Exception:
                     _LOG.exception("Task runner loop error")
 
-                await asyncio.sleep(POLL_INTERVAL)
+                await self._wait_for_wake()
         except asyncio.CancelledError:
             _LOG.info("Task runner cancelled, cleaning up %d agents", len(self.agents))
             await self._shutdown_all_agents()
             raise
 
+    async def _dispatch_ready_tasks(self) -> int:
+        """Claim ready tasks and spawn agents for them up to CONCURRENCY. Returns the number spawned."""
+        available = CONCURRENCY - len(self.agents)
+        if available <= 0:
+            return 0
+        # Fetch every channel's ready list at once rather than one `bd ready`
+        # after another; claiming stays sequential so CONCURRENCY holds.
+        ready = await asyncio.gather(*(self._get_ready_tasks(c) for c in self.beads_channels))
+        spawned = 0
+        for channel, tasks in zip(self.beads_channels, ready):
+            if available <= 0:
+                break
+            for task in tasks:
+                task_id = task.get("id")
+                if task_id in self.agents:
+                    continue
+                if await self._claim_task(task_id, channel.name):
+                    agent = await self._spawn_agent(task, channel)
+                    if agent:
+                        self.agents[task_id] = agent
+                        available -= 1
+                        spawned += 1
+                    else:
+                        # Spawn failed -- reopen so task can be retried later.
+                        # If reopen also fails, the task is stuck in in_progress;
+                        # the stuck-task sweep below will catch it.
+                        await self._run_bd(["bd", "reopen", task_id], channel.name)
+                if available <= 0:
+                    break
+        return spawned
+
+    def wake(self) -> None:
+        """Run the next poll iteration now instead of after POLL_INTERVAL."""
+        self._wake.set()
+
+    async def _wait_for_wake(self) -> None:
+        """Sleep until :meth:`wake` is called, the next agent deadline, or POLL_INTERVAL."""
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=self._next_poll_delay())
+        except TimeoutError:
+            pass
+        self._wake.clear()
+
+    def _next_poll_delay(self) -> float:
+        """Return how long to sleep before the next poll.
+
+        POLL_MIN_WAIT while a burst of spawns is within POLL_BUDGET, otherwise
+        POLL_INTERVAL shortened so the poll lands just after the oldest agent's
+        timeout or the end of a closed task's grace period.
+        """
+        if 0 < self._burst <= POLL_BUDGET:
+            return POLL_MIN_WAIT
+        delay = float(POLL_INTERVAL)
+        if self.agents:
+            now = datetime.now()
+            oldest = min(agent.started_at for agent in self.agents.values())
+            remaining = AGENT_TIMEOUT - (now - oldest).total_seconds()
+            # +1s so the `secs > AGENT_TIMEOUT` check in _check_agents has tripped.
+            delay = min(delay, max(remaining, 0.0) + 1.0)
+            for agent in self.agents.values():
+                if agent.closed_detected_at is not None:
+                    grace_left = CLOSED_TASK_GRACE_PERIOD - (now - agent.closed_detected_at).total_seconds()
+                    delay = min(delay, max(grace_left, POLL_MIN_WAIT))
+        return delay
+
+    def _watch_exit(self, proc: asyncio.subprocess.Process) -> None:
+        """Wake the poll loop as soon as *proc* exits, so completion is handled immediately."""
+        async def _wait() -> None:
+            await proc.wait()
+            self._wake.set()
+
+        task = asyncio.get_running_loop().create_task(_wait())
+        self._exit_watchers.add(task)
+        task.add_done_callback(self._exit_watchers.discard)
+
     async def _shutdown_all_agents(self) -> None:
         """Kill and clean up all running agents. Called on shutdown."""
         for task_id, agent in list(self.agents.items()):
@@ -223,8 +424,13 @@ class TaskRunner:
                 _LOG.warning("Failed to reopen task %s during shutdown", task_id)
         self.agents.clear()
 
-    async def _run_bd(self, cmd: list[str], channel_name: str, timeout: int = 30) -> tuple[int, str, str]:
-        """Run a bd command in a channel directory."""
+    async def _run_bd(self, cmd: list[str], channel_name: str, timeout: int = 30) -> tuple[int, bytes, str]:
+        """Run a bd command in a channel directory.
+
+        Returns ``(returncode, stdout, stderr)``. stdout stays raw bytes: every
+        caller feeds it straight to ``json.loads``, which decodes UTF-8 itself,
+        so ``bd list``/``bd ready`` output is not copied into a ``str`` first.
+        """
         # Run as wendy user to match CLI subprocess permissions -- running as root
         # creates root-owned .beads/config.yaml that the CLI subprocess can't read.
         bd_env = {k: v for k, v in os.environ.items() if k not in SENSITIVE_ENV_VARS}
@@ -242,20 +448,58 @@ class TaskRunner:
                 **user_kwargs,
             )
             stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
-            return proc.returncode, stdout.decode(), stderr.decode()
+            return proc.returncode, stdout, stderr.decode(errors="replace")
         except TimeoutError:
             _LOG.warning("bd command timed out: %s", cmd)
             if proc is not None:
                 await _kill_and_reap(proc)
-            return -1, "", "timeout"
+            return -1, b"", "timeout"
         except FileNotFoundError:
             _LOG.error("bd command not found")
-            return -1, "", "not found"
+            return -1, b"", "not found"
+
+    @staticmethod
+    def _beads_signature(channel: ChannelBeads) -> frozenset | None:
+        """Return ``(name, mtime_ns, size)`` for each file in the beads dir, or None if unreadable.
+
+        Any bd write (ours, an agent's, or Wendy's) touches the database or
+        its WAL, so an unchanged signature means bd output is unchanged too.
+        """
+        entries = []
+        try:
+            with os.scandir(channel.beads_path) as it:
+                for entry in it:
+                    if entry.is_file():
+                        st = entry.stat()
+                        entries.append((entry.name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            return None
+        return frozenset(entries)
+
+    def _cached_bd_result(self, channel: ChannelBeads, kind: str, signature: frozenset | None) -> list[dict] | None:
+        """Return the last parsed *kind* result for *channel* if the beads dir is unchanged."""
+        cached = self._bd_cache.get((channel.name, kind))
+        if (
+            signature is not None
+            and cached is not None
+            and cached[0] == signature
+            and time.monotonic() - cached[1] < BD_CACHE_MAX_AGE
+        ):
+            return cached[2]
+        return None
 
     async def _get_ready_tasks(self, channel: ChannelBeads) -> list[dict]:
-        """Get ready, unassigned tasks from a channel's beads queue."""
-        if not (channel.beads_path / "config.yaml").exists():
+        """Get ready, unassigned tasks from a channel's beads queue.
+
+        Skips the `bd ready` fork when the beads dir hasn't changed since the
+        last successful call.
+        """
+        if not channel.is_initialized():
             return []
+        signature = self._beads_signature(channel)
+        cached = self._cached_bd_result(channel, "ready", signature)
+        if cached is not None:
+            return cached
         code, stdout, stderr = await self._run_bd(
             ["bd", "ready", "--unassigned", "--sort", "priority", "--json"],
             channel.name,
@@ -264,11 +508,13 @@ class TaskRunner:
             return []
         try:
             tasks = json.loads(stdout)
-            for t in tasks:
-                t["_channel_name"] = channel.name
-            return tasks
         except json.JSONDecodeError:
             return []
+        for t in tasks:
+            t["_channel_name"] = channel.name
+        if signature is not None:
+            self._bd_cache[(channel.name, "ready")] = (signature, time.monotonic(), tasks)
+        return tasks
 
     async def _claim_task(self, task_id: str, channel_name: str) -> bool:
         """Claim a task by marking it in_progress."""
@@ -292,25 +538,27 @@ class TaskRunner:
         title = task.get("title", "Untitled")
         channel_name = channel.name
 
-        # Get full details
-        details = await self._get_task_details(task_id, channel_name)
-        description = (details or task).get("description", "")
-        labels = (details or task).get("labels", [])
+        # `bd ready --json` usually carries the full issue already; only fork a
+        # `bd show` when the fields the prompt needs are missing from it.
+        details = task
+        if "description" not in task or "labels" not in task:
+            details = await self._get_task_details(task_id, channel_name) or task
+        description = details.get("description") or ""
+        labels = details.get("labels") or []
 
         # Parse model from labels (e.g., "model:opus")
         model = None
-        for label in labels or []:
+        for label in labels:
             if label.startswith("model:"):
                 model = label.split(":", 1)[1]
                 break
         model = resolve_model(model or "opus")
 
-        # Escape braces in user-controlled fields so they are not interpreted
-        # as .format() placeholders (e.g., a task title of "{task_id}" would
-        # otherwise cause a KeyError or leak internal variable names).
-        safe_title = title.replace("{", "{{").replace("}", "}}")
-        safe_description = description.replace("{", "{{").replace("}", "}}")
-        prompt = AGENT_PROMPT_TEMPLATE.format(task_id=task_id, title=safe_title, description=safe_description)
+        # Substituted values are never re-parsed as placeholders, so braces in
+        # user-controlled fields (e.g. a title of "{task_id}") pass through as-is.
+        prompt = AGENT_PROMPT_TEMPLATE.format_map(
+            {"task_id": task_id, "title": title, "description": description}
+        )
 
         # Create log file
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -318,48 +566,33 @@ class TaskRunner:
 
         try:
             # Check for session to fork from
+            # Read directly rather than exists() + read: a missing file just
+            # means there is nothing to fork.
             fork_session_id = None
-            if channel.current_session_path.exists():
-                try:
-                    fork_session_id = channel.current_session_path.read_text().strip()
-                    sess_file = channel.session_path / f"{fork_session_id}.jsonl"
-                    if not sess_file.exists():
-                        fork_session_id = None
-                except Exception:
+            try:
+                fork_session_id = channel.current_session_path.read_text().strip()
+                sess_file = channel.session_path / f"{fork_session_id}.jsonl"
+                if not sess_file.exists():
                     fork_session_id = None
+            except Exception:
+                fork_session_id = None
 
-            cmd = ["claude"]
+            fork_args: tuple[str, ...] = ()
             if fork_session_id:
-                cmd.extend(["--resume", fork_session_id, "--fork-session"])
+                fork_args = ("--resume", fork_session_id, "--fork-session")
                 _LOG.info("Forking from session %s for task %s", fork_session_id[:8], task_id)
 
-            allowed_tools = (
-                f"Read,WebSearch,WebFetch,Bash,Glob,Grep,TodoWrite,"
-                f"Edit(//data/wendy/channels/{channel_name}/**),Write(//data/wendy/channels/{channel_name}/**),"
-                f"Edit(//data/wendy/claude_fragments/people/**),Write(//data/wendy/claude_fragments/people/**),"
-                f"Write(//data/wendy/tmp/**),Write(//tmp/**)"
-            )
-            disallowed_tools = "Edit(//app/**),Write(//app/**),Skill,TodoRead"
-
-            cmd.extend([
+            cmd = [
+                "claude", *fork_args,
                 "-p", prompt,
-                "--max-turns", "9999",
-                "--strict-mcp-config",
-                "--allowedTools", allowed_tools,
-                "--disallowedTools", disallowed_tools,
-                "--output-format", "stream-json",
-                "--verbose",
+                "--allowedTools", _agent_allowed_tools(channel_name),
+                *_AGENT_CMD_TAIL,
                 "--model", model,
-            ])
+            ]
 
             # Append agent system prompt if available
-            if AGENT_SYSTEM_PROMPT_FILE.exists():
-                try:
-                    context = AGENT_SYSTEM_PROMPT_FILE.read_text().strip()
-                    if context:
-                        cmd.extend(["--append-system-prompt", context])
-                except Exception:
-                    pass
+            if context := _agent_system_prompt():
+                cmd.extend(["--append-system-prompt", context])
 
             # Build env for CLI subprocess isolation
             agent_env = {k: v for k, v in os.environ.items() if k not in SENSITIVE_ENV_VARS}
@@ -374,6 +607,7 @@ class TaskRunner:
             user_kwargs = {"user": CLI_SUBPROCESS_UID} if CLI_SUBPROCESS_UID else {}
 
             log_file = open(log_path, "w")
+            self._logs_since_cleanup += 1
             try:
                 log_file.write(f"Task: {task_id} - {title}\n")
                 log_file.write(f"Channel: {channel_name}\n")
@@ -382,12 +616,15 @@ class TaskRunner:
                 log_file.write("=" * 60 + "\n\n")
                 log_file.flush()
 
+                # Own session: a Ctrl-C / group signal aimed at the bot doesn't
+                # hit agents directly; shutdown kills and reopens them instead.
                 proc = await asyncio.create_subprocess_exec(
                     *cmd,
                     stdout=log_file,
                     stderr=asyncio.subprocess.STDOUT,
                     cwd=channel_dir(channel_name),
                     env=agent_env,
+                    start_new_session=True,
                     **user_kwargs,
                 )
             except Exception:
@@ -395,6 +632,7 @@ class TaskRunner:
                 raise
 
             _LOG.info("Spawned agent for task %s: %s (model=%s)", task_id, title, model)
+            self._watch_exit(proc)
             return RunningAgent(
                 task_id=task_id,
                 title=title,
@@ -429,8 +667,9 @@ class TaskRunner:
     async def _check_agents(self) -> None:
         """Check running agents for completion or timeout."""
         finished = []
+        now = datetime.now()
         for task_id, agent in self.agents.items():
-            duration = datetime.now() - agent.started_at
+            duration = now - agent.started_at
             secs = duration.total_seconds()
 
             # Check timeout -- process is still alive but exceeded the time limit
@@ -443,7 +682,7 @@ class TaskRunner:
                     agent.channel_name,
                 )
                 await self._run_bd(["bd", "close", task_id], agent.channel_name)
-                self._notify_completion(task_id, agent.title, False, f"{duration} (TIMEOUT)")
+                await self._notify_completion(task_id, agent.title, False, f"{duration} (TIMEOUT)")
                 finished.append(task_id)
                 continue
 
@@ -462,7 +701,7 @@ class TaskRunner:
                     # Agent exited cleanly -- it should have already called `bd close`
                     # itself, but close it here as a safety net.
                     await self._run_bd(["bd", "close", task_id], agent.channel_name)
-                    self._notify_completion(task_id, agent.title, True, str(duration))
+                    await self._notify_completion(task_id, agent.title, True, str(duration))
                 else:
                     # Agent crashed or errored -- mark as failed, not completed
                     await self._run_bd(
@@ -470,7 +709,7 @@ class TaskRunner:
                         agent.channel_name,
                     )
                     await self._run_bd(["bd", "close", task_id], agent.channel_name)
-                    self._notify_completion(task_id, agent.title, False, f"{duration} (exit code {exit_code})")
+                    await self._notify_completion(task_id, agent.title, False, f"{duration} (exit code {exit_code})")
                 finished.append(task_id)
 
         for tid in finished:
@@ -478,74 +717,111 @@ class TaskRunner:
 
     async def _check_closed_tasks(self) -> None:
         """Kill agents whose tasks were closed externally."""
-        to_kill = []
+        live: list[tuple[str, RunningAgent]] = []
         for task_id, agent in self.agents.items():
             if agent.process.returncode is not None:
                 # Will be cleaned up by _check_agents on next poll
                 agent.closed_detected_at = None
                 continue
+            live.append((task_id, agent))
+
+        # One `bd list` per channel with live agents instead of a `bd show` per
+        # agent. It is the same cached listing the beads snapshot uses, so an
+        # unchanged beads dir costs no fork at all.
+        channels = [c for c in self.beads_channels if any(a.channel_name == c.name for _, a in live)]
+        listings = await asyncio.gather(*(self._list_channel_beads(c) for c in channels))
+        status = {
+            (issue.get("_channel"), issue.get("id")): issue.get("status")
+            for issues in listings for issue in issues
+        }
 
-            details = await self._get_task_details(task_id, agent.channel_name)
-            if details and details.get("status") == "closed":
-                now = datetime.now()
-                if agent.closed_detected_at is None:
-                    agent.closed_detected_at = now
-                    _LOG.info("Task %s closed externally, grace period %ds", task_id, CLOSED_TASK_GRACE_PERIOD)
-                elif (now - agent.closed_detected_at).total_seconds() >= CLOSED_TASK_GRACE_PERIOD:
-                    to_kill.append(task_id)
+        to_kill = []
+        now = datetime.now()
+        for task_id, agent in live:
+            if status.get((agent.channel_name, task_id)) != "closed":
+                # Reopened during the grace period (or the listing failed).
+                agent.closed_detected_at = None
+            elif agent.closed_detected_at is None:
+                agent.closed_detected_at = now
+                _LOG.info("Task %s closed externally, grace period %ds", task_id, CLOSED_TASK_GRACE_PERIOD)
+            elif (now - agent.closed_detected_at).total_seconds() >= CLOSED_TASK_GRACE_PERIOD:
+                to_kill.append(task_id)
 
         for task_id in to_kill:
             agent = self.agents[task_id]
             _LOG.info("Killing agent for externally-closed task %s", task_id)
             await self._cleanup_agent(agent, kill=True)
             duration = datetime.now() - agent.started_at
-            self._notify_completion(task_id, agent.title, False, f"{duration} (CANCELLED)")
+            await self._notify_completion(task_id, agent.title, False, f"{duration} (CANCELLED)")
             del self.agents[task_id]
 
-    def _notify_completion(self, task_id: str, title: str, success: bool, duration: str) -> None:
-        """Write completion notification to SQLite."""
+    async def _notify_completion(self, task_id: str, title: str, success: bool, duration: str) -> None:
+        """Write completion notification to SQLite (on the DB thread)."""
         status = "completed" if success else "failed"
-        channel_id = int(NOTIFY_CHANNEL) if NOTIFY_CHANNEL else None
         try:
-            state_manager.add_notification(
-                type="task_completion",
-                source="task_runner",
-                title=title,
-                channel_id=channel_id,
-                payload={"task_id": task_id, "status": status, "duration": duration},
+            await state_manager.run(
+                _write_completion_notification,
+                title,
+                NOTIFY_CHANNEL_ID,
+                {"task_id": task_id, "status": status, "duration": duration},
             )
-            state_manager.cleanup_old_notifications(keep_count=100)
         except Exception:
             _LOG.exception("Failed to write completion notification for %s", task_id)
+            return
+        if self._on_notification is not None:
+            self._on_notification()
 
     async def _write_beads_snapshot(self) -> None:
         """Write a combined beads snapshot for the web dashboard.
 
         The web service can't run bd (it's not installed there), so we write
-        a JSON file to the shared volume every poll cycle.
+        a JSON file to the shared volume. It is rewritten only when the beads
+        actually changed since the last poll.
         """
         snapshot_path = WENDY_BASE / "shared" / "beads_snapshot.json"
-        all_beads: list[dict] = []
         try:
-            for channel in self.beads_channels:
-                if not (channel.beads_path / "config.yaml").exists():
-                    continue
-                code, stdout, _ = await self._run_bd(
-                    ["bd", "list", "--json"], channel.name, timeout=10,
-                )
-                if code != 0 or not stdout.strip():
-                    continue
-                try:
-                    issues = json.loads(stdout)
-                    for issue in issues:
-                        issue["_channel"] = channel.name
-                    all_beads.extend(issues)
-                except json.JSONDecodeError:
-                    continue
-            snapshot_path.write_text(json.dumps(all_beads))
+            channels = [c for c in self.beads_channels if c.is_initialized()]
+            # Channels are independent, so their `bd list` calls run concurrently.
+            per_channel = await asyncio.gather(*(self._list_channel_beads(c) for c in channels))
+            all_beads = [issue for issues in per_channel for issue in issues]
+            payload = json.dumps(all_beads)
+            if payload == self._last_snapshot:
+                return
+            await asyncio.to_thread(write_text_atomic, snapshot_path, payload)
+            self._last_snapshot = payload
         except Exception:
             _LOG.debug("Failed to write beads snapshot", exc_info=True)
 
+    async def _list_channel_beads(self, channel: ChannelBeads) -> list[dict]:
+        """Return every issue in a channel's beads DB, tagged with ``_channel``.
+
+        Like :meth:`_get_ready_tasks`, reuses the last result while the beads
+        dir is unchanged.
+        """
+        signature = self._beads_signature(channel)
+        cached = self._cached_bd_result(channel, "list", signature)
+        if cached is not None:
+            return cached
+        code, stdout, _ = await self._run_bd(
+            ["bd", "list", "--json"], channel.name, timeout=10,
+        )
+        if code != 0 or not stdout.strip():
+            return []
+        try:
+            issues = json.loads(stdout)
+        except json.JSONDecodeError:
+            return []
+        for issue in issues:
+            issue["_channel"] = channel.name
+        if signature is not None:
+            self._bd_cache[(channel.name, "list")] = (signature, time.monotonic(), issues)
+        return issues
+
+    def request_usage_refresh(self) -> None:
+        """Re-run the usage check on an immediate poll, regardless of the hourly interval."""
+        self._usage_refresh_requested = True
+        self._wake.set()
+
     async def _check_usage(self) -> None:
         """Periodically check Claude Code usage via get_usage.sh.
 
@@ -558,15 +834,10 @@ class TaskRunner:
         usage_poll_interval = 3600  # 1 hour
         usage_script = Path("/app/scripts/get_usage.sh")
         usage_data_file = WENDY_BASE / "usage_data.json"
-        force_check_file = WENDY_BASE / "usage_force_check"
 
         now = time.time()
-        force = force_check_file.exists()
-        if force:
-            try:
-                force_check_file.unlink()
-            except Exception:
-                pass
+        force = self._usage_refresh_requested
+        self._usage_refresh_requested = False
 
         if not force and now - self._last_usage_check < usage_poll_interval:
             return
@@ -615,7 +886,7 @@ class TaskRunner:
                     if key in usage:
                         usage[key] = min(100, int(usage[key] / USAGE_BUDGET_FACTOR))
             usage["updated_at"] = datetime.now().isoformat()
-            usage_data_file.write_text(json.dumps(usage, indent=2))
+            await asyncio.to_thread(write_text_atomic, usage_data_file, json.dumps(usage))
             _LOG.info("Usage: week_all=%s%%, week_sonnet=%s%%",
                       usage.get("week_all_percent", 0), usage.get("week_sonnet_percent", 0))
         except TimeoutError:
@@ -626,10 +897,12 @@ class TaskRunner:
             _LOG.warning("Usage check failed", exc_info=True)
 
     def _cleanup_logs(self) -> None:
-        """Trim old agent log files."""
+        """Trim old agent log files, only when a new one was created since the last trim."""
+        if not self._logs_since_cleanup:
+            return
         try:
-            logs = sorted(LOG_DIR.glob("agent_*.log"), key=lambda f: f.stat().st_mtime)
-            for old in logs[:-MAX_LOG_FILES]:
-                old.unlink()
+            for old in files_beyond_newest(LOG_DIR, MAX_LOG_FILES, prefix="agent_", suffix=".log"):
+                os.unlink(old)
+            self._logs_since_cleanup = 0
         except Exception:
             pass